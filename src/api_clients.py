@@ -1,14 +1,44 @@
 """Clientes para APIs de ofertas de juegos."""
 
+import asyncio
+import copy
+import functools
+import json
+import logging
+import time
 import aiohttp
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 from src.config import CHEAPSHARK_API_BASE, ITAD_API_BASE
 
+logger = logging.getLogger(__name__)
+
+# Prefijo de los enlaces de redirección a las ofertas de CheapShark
+CHEAPSHARK_REDIRECT_URL = "https://www.cheapshark.com/redirect?dealID="
 
-@dataclass
+# Máximo de IDs por petición a ITAD para no exceder el largo de la URL
+ITAD_PLAINS_PER_REQUEST = 50
+
+
+@dataclass(slots=True, frozen=True)
 class GameDeal:
     """Representa una oferta de juego."""
     title: str
@@ -19,98 +49,239 @@ class GameDeal:
     url: str
     deal_id: str
     timestamp: datetime
+    # Clave (título, tienda) normalizada, calculada una sola vez para deduplicar
+    _dedupe_key: Tuple[str, str] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "_dedupe_key", (self.title.casefold(), self.store.casefold()))
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PriceHistory:
     """Historial de precios de un juego."""
     game_id: str
     store: str
     price: float
-    timestamp: datetime
+    timestamp: int  # Segundos Unix; ver `as_datetime`
     is_historical_low: bool = False
+    
+    @property
+    def as_datetime(self) -> datetime:
+        """Fecha del registro, convertida solo cuando se necesita."""
+        return datetime.fromtimestamp(self.timestamp)
+
+
+def to_float(value: Any) -> float:
+    """Convierte un valor de la API a float, sin reconstruirlo si ya lo es."""
+    return value if type(value) is float else float(value)
+
+
+async def check_response(response: aiohttp.ClientResponse):
+    """
+    Lanza ClientResponseError si la respuesta no fue exitosa.
+    
+    Antes de lanzar se consume el cuerpo (pequeño en respuestas de error como
+    429) para que la conexión vuelva al pool en lugar de cerrarse.
+    """
+    if not response.ok:
+        await response.read()
+        response.raise_for_status()
+
+
+def ttl_cache(ttl: float = 600, maxsize: int = 512):
+    """
+    Cachea por instancia el resultado de un método async durante `ttl` segundos.
+    
+    Requiere que la instancia tenga un diccionario `_cache`. Solo se guardan
+    resultados no vacíos para no memorizar errores, y se devuelve una copia
+    superficial para que el llamador no modifique la entrada cacheada.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args):
+            key = (func.__name__, args)
+            now = time.monotonic()
+            entry = self._cache.get(key)
+            if entry and entry[0] > now:
+                return copy.copy(entry[1])
+            
+            result = await func(self, *args)
+            if result:
+                self._cache.pop(key, None)
+                if len(self._cache) >= maxsize:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = (now + ttl, result)
+                return copy.copy(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def create_session(limit: int = 32, limit_per_host: int = 8,
+                   keepalive_timeout: float = 75) -> aiohttp.ClientSession:
+    """Crea una sesión HTTP con keep-alive y caché DNS."""
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=300,
+        keepalive_timeout=keepalive_timeout
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=15),
+        json_serialize=json_dumps
+    )
+
+
+async def _close_session(session: aiohttp.ClientSession):
+    """Cierra una sesión descartada; los errores de un loop ya cerrado se ignoran."""
+    try:
+        await session.close()
+    except Exception as e:
+        logger.debug("Error cerrando sesión HTTP anterior: %s", e)
+
+
+class SessionHolder:
+    """
+    Mantiene una única sesión HTTP reutilizable entre peticiones.
+    
+    La sesión se crea de forma perezosa dentro del event loop activo y se
+    recrea si el loop cambió (por ejemplo, entre llamadas a `asyncio.run`).
+    """
+    
+    def __init__(self, **session_options: Any):
+        self._session_options = session_options
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Cierres pendientes de sesiones de loops anteriores
+        self._closing: Set[asyncio.Task] = set()
+    
+    def get(self) -> aiohttp.ClientSession:
+        """Obtiene la sesión activa, creándola si es necesario."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._discard()
+            self._session = create_session(**self._session_options)
+            self._loop = loop
+        return self._session
+    
+    def _discard(self):
+        """
+        Cierra la sesión ligada a un loop anterior antes de reemplazarla.
+        
+        Si ese loop sigue corriendo (en otro hilo), el cierre se agenda en él;
+        si no, se agenda en el loop actual para no dejar el conector abierto.
+        """
+        session, loop = self._session, self._loop
+        if session is None or session.closed:
+            return
+        
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(_close_session(session), loop)
+        else:
+            self._closing.add(asyncio.get_running_loop().create_task(_close_session(session)))
+            self._closing = {task for task in self._closing if not task.done()}
+    
+    async def close(self):
+        """Cierra la sesión si está abierta."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
 
 
 class CheapSharkClient:
     """Cliente para la API de CheapShark."""
     
-    def __init__(self):
+    def __init__(self, get_session: Optional[Callable[[], aiohttp.ClientSession]] = None):
         self.base_url = CHEAPSHARK_API_BASE
+        self._get_session = get_session or SessionHolder().get
+        self._cache: Dict[Any, Any] = {}
     
     async def search_game(self, query: str) -> List[Dict[str, Any]]:
         """Busca juegos por nombre."""
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/games"
-            params = {"title": query, "limit": 20}
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data if isinstance(data, list) else []
-                    return []
-            except Exception as e:
-                print(f"Error en CheapShark search: {e}")
-                return []
+        session = self._get_session()
+        url = f"{self.base_url}/games"
+        params = {"title": query, "limit": 20}
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                return await response.json(loads=json_loads)
+        except Exception as e:
+            logger.warning("Error en CheapShark search: %s", e)
+            return []
     
     async def get_deals(self, store_id: Optional[str] = None, 
                        upper_price: Optional[float] = None,
                        lower_price: Optional[float] = None) -> List[GameDeal]:
         """Obtiene ofertas de juegos."""
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/deals"
-            params = {}
-            
-            if store_id:
-                params["storeID"] = store_id
-            if upper_price:
-                params["upperPrice"] = str(int(upper_price))
-            if lower_price:
-                params["lowerPrice"] = str(int(lower_price))
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        deals = []
-                        
-                        for deal in data:
-                            try:
-                                game_deal = GameDeal(
-                                    title=deal.get("title", "Unknown"),
-                                    store=deal.get("storeID", "Unknown"),
-                                    price=float(deal.get("salePrice", 0)),
-                                    original_price=float(deal.get("normalPrice", 0)),
-                                    discount_percent=float(deal.get("savings", 0)),
-                                    url=f"https://www.cheapshark.com/redirect?dealID={deal.get('dealID')}",
-                                    deal_id=deal.get("dealID", ""),
-                                    timestamp=datetime.now()
-                                )
-                                deals.append(game_deal)
-                            except (ValueError, KeyError) as e:
-                                continue
-                        
-                        return deals
-                    return []
-            except Exception as e:
-                print(f"Error en CheapShark get_deals: {e}")
-                return []
+        session = self._get_session()
+        url = f"{self.base_url}/deals"
+        params = {}
+        
+        if store_id:
+            params["storeID"] = store_id
+        if upper_price:
+            params["upperPrice"] = str(int(upper_price))
+        if lower_price:
+            params["lowerPrice"] = str(int(lower_price))
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                deals = []
+                now = datetime.now()
+                
+                async for deal in self._iter_items(response):
+                    try:
+                        game_deal = GameDeal(
+                            title=deal.get("title", "Unknown"),
+                            store=deal.get("storeID", "Unknown"),
+                            price=to_float(deal.get("salePrice", 0)),
+                            original_price=to_float(deal.get("normalPrice", 0)),
+                            discount_percent=to_float(deal.get("savings", 0)),
+                            url=CHEAPSHARK_REDIRECT_URL + str(deal.get("dealID")),
+                            deal_id=deal.get("dealID", ""),
+                            timestamp=now
+                        )
+                        deals.append(game_deal)
+                    except (ValueError, KeyError) as e:
+                        continue
+                
+                return deals
+        except Exception as e:
+            logger.warning("Error en CheapShark get_deals: %s", e)
+            return []
+    
+    async def _iter_items(self, response: aiohttp.ClientResponse):
+        """
+        Itera los elementos de una respuesta JSON de tipo lista.
+        
+        Con ijson los elementos se parsean en streaming a medida que llega el
+        cuerpo; sin ijson se decodifica la respuesta completa.
+        """
+        if IJSON_AVAILABLE:
+            async for item in ijson.items_async(response.content, "item", use_float=True):
+                yield item
+        else:
+            for item in await response.json(loads=json_loads):
+                yield item
     
+    @ttl_cache()
     async def get_game_info(self, game_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene información detallada de un juego."""
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/games"
-            params = {"id": game_id}
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data if isinstance(data, dict) else None
-                    return None
-            except Exception as e:
-                print(f"Error en CheapShark get_game_info: {e}")
-                return None
+        session = self._get_session()
+        url = f"{self.base_url}/games"
+        params = {"id": game_id}
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                return await response.json(loads=json_loads)
+        except Exception as e:
+            logger.warning("Error en CheapShark get_game_info: %s", e)
+            return None
     
     async def get_price_history(self, game_id: str) -> List[PriceHistory]:
         """Obtiene historial de precios de un juego."""
@@ -122,226 +293,326 @@ class CheapSharkClient:
 class ITADClient:
     """Cliente para la API de IsThereAnyDeal."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None,
+                 get_session: Optional[Callable[[], aiohttp.ClientSession]] = None):
         self.base_url = ITAD_API_BASE
         self.api_key = api_key or ""
+        # Sin API key ningún método de ITAD hace peticiones
+        self.enabled = bool(self.api_key)
+        self._get_session = get_session or SessionHolder().get
+        self._cache: Dict[Any, Any] = {}
     
+    @ttl_cache()
     async def search_game(self, query: str) -> List[Dict[str, Any]]:
         """Busca juegos por nombre."""
-        if not self.api_key:
+        if not self.enabled:
             return []
         
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/search/search"
-            params = {
-                "key": self.api_key,
-                "q": query,
-                "limit": 20
-            }
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get(".meta", {}).get("match") == "found":
-                            return data.get(".data", {}).get("list", [])
-                        return []
-                    return []
-            except Exception as e:
-                print(f"Error en ITAD search: {e}")
+        session = self._get_session()
+        url = f"{self.base_url}/search/search"
+        params = {
+            "key": self.api_key,
+            "q": query,
+            "limit": 20
+        }
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                data = await response.json(loads=json_loads)
+                if data.get(".meta", {}).get("match") == "found":
+                    return data.get(".data", {}).get("list", [])
                 return []
+        except Exception as e:
+            logger.warning("Error en ITAD search: %s", e)
+            return []
     
     async def get_current_prices(self, game_id: str) -> List[GameDeal]:
         """Obtiene precios actuales de un juego en todas las tiendas."""
-        if not self.api_key:
-            return []
+        prices = await self.get_current_prices_bulk([game_id])
+        return prices.get(game_id, [])
+    
+    async def get_current_prices_bulk(self, game_ids: List[str]) -> Dict[str, List[GameDeal]]:
+        """
+        Obtiene precios actuales de varios juegos agrupando las peticiones.
         
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/game/prices"
-            params = {
-                "key": self.api_key,
-                "plains": game_id,
-                "region": "us",
-                "country": "US"
-            }
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        deals = []
-                        
-                        game_data = data.get(".data", {}).get(game_id, {})
-                        stores = game_data.get("list", [])
-                        
-                        for store in stores:
-                            try:
-                                price_new = float(store.get("price_new", 0))
-                                price_old = float(store.get("price_old", 0))
-                                discount = ((price_old - price_new) / price_old * 100) if price_old > 0 else 0
-                                
-                                game_deal = GameDeal(
-                                    title=game_data.get("title", "Unknown"),
-                                    store=store.get("shop", {}).get("name", "Unknown"),
-                                    price=price_new,
-                                    original_price=price_old,
-                                    discount_percent=discount,
-                                    url=store.get("url", ""),
-                                    deal_id=store.get("id", ""),
-                                    timestamp=datetime.now()
-                                )
-                                deals.append(game_deal)
-                            except (ValueError, KeyError) as e:
-                                continue
-                        
-                        return deals
-                    return []
-            except Exception as e:
-                print(f"Error en ITAD get_current_prices: {e}")
-                return []
+        ITAD acepta varios `plains` separados por comas; los IDs se envían en
+        bloques de ITAD_PLAINS_PER_REQUEST y los bloques se consultan en paralelo.
+        """
+        if not self.enabled or not game_ids:
+            return {}
+        
+        unique_ids = list(dict.fromkeys(game_ids))
+        chunks = [
+            unique_ids[i:i + ITAD_PLAINS_PER_REQUEST]
+            for i in range(0, len(unique_ids), ITAD_PLAINS_PER_REQUEST)
+        ]
+        results = await asyncio.gather(*(self._get_prices_chunk(",".join(chunk)) for chunk in chunks))
+        
+        prices: Dict[str, List[GameDeal]] = {}
+        for result in results:
+            for game_id, deals in result.items():
+                prices[game_id] = list(deals)
+        return prices
+    
+    @ttl_cache()
+    async def _get_prices_chunk(self, plains: str) -> Dict[str, List[GameDeal]]:
+        """Consulta los precios de un bloque de IDs separados por comas."""
+        session = self._get_session()
+        url = f"{self.base_url}/game/prices"
+        params = {
+            "key": self.api_key,
+            "plains": plains,
+            "region": "us",
+            "country": "US"
+        }
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                data = await response.json(loads=json_loads)
+                prices = {}
+                now = datetime.now()
+                
+                for game_id, game_data in data.get(".data", {}).items():
+                    deals = []
+                    
+                    for store in game_data.get("list", []):
+                        try:
+                            price_new = to_float(store.get("price_new", 0))
+                            price_old = to_float(store.get("price_old", 0))
+                            discount = ((price_old - price_new) / price_old * 100) if price_old > 0 else 0
+                            
+                            game_deal = GameDeal(
+                                title=game_data.get("title", "Unknown"),
+                                store=store.get("shop", {}).get("name", "Unknown"),
+                                price=price_new,
+                                original_price=price_old,
+                                discount_percent=discount,
+                                url=store.get("url", ""),
+                                deal_id=store.get("id", ""),
+                                timestamp=now
+                            )
+                            deals.append(game_deal)
+                        except (ValueError, KeyError) as e:
+                            continue
+                    
+                    prices[game_id] = deals
+                
+                return prices
+        except Exception as e:
+            logger.warning("Error en ITAD get_current_prices: %s", e)
+            return {}
     
     async def get_price_history(self, game_id: str, shop: Optional[str] = None) -> List[PriceHistory]:
         """Obtiene historial de precios de un juego."""
-        if not self.api_key:
+        if not self.enabled:
             return []
         
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/game/history"
-            params = {
-                "key": self.api_key,
-                "plains": game_id,
-                "region": "us",
-                "country": "US"
-            }
-            
-            if shop:
-                params["shops"] = shop
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        history = []
-                        
-                        game_data = data.get(".data", {}).get(game_id, {})
-                        shops = game_data.get("list", [])
-                        
-                        for shop_data in shops:
-                            shop_name = shop_data.get("shop", {}).get("name", "Unknown")
-                            prices = shop_data.get("history", [])
-                            
-                            # Encontrar el precio mínimo histórico
-                            min_price = min((p.get("price", float('inf')) for p in prices), default=float('inf'))
+        session = self._get_session()
+        url = f"{self.base_url}/game/history"
+        params = {
+            "key": self.api_key,
+            "plains": game_id,
+            "region": "us",
+            "country": "US"
+        }
+        
+        if shop:
+            params["shops"] = shop
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                data = await response.json(loads=json_loads)
+                history = []
+                
+                game_data = data.get(".data", {}).get(game_id, {})
+                shops = game_data.get("list", [])
+                
+                for shop_data in shops:
+                    shop_name = shop_data.get("shop", {}).get("name", "Unknown")
+                    prices = shop_data.get("history", [])
+                    entries = []
+                    
+                    # El mínimo histórico se calcula en la misma pasada
+                    min_price = float('inf')
+                    min_indexes = []
+                    
+                    for price_point in prices:
+                        try:
+                            price = to_float(price_point.get("price", 0))
+                            timestamp = int(price_point.get("time", 0))
                             
-                            for price_point in prices:
-                                try:
-                                    price = float(price_point.get("price", 0))
-                                    timestamp_str = price_point.get("time", 0)
-                                    timestamp = datetime.fromtimestamp(timestamp_str)
-                                    
-                                    price_history = PriceHistory(
-                                        game_id=game_id,
-                                        store=shop_name,
-                                        price=price,
-                                        timestamp=timestamp,
-                                        is_historical_low=(price == min_price and min_price != float('inf'))
-                                    )
-                                    history.append(price_history)
-                                except (ValueError, KeyError) as e:
-                                    continue
+                            price_history = PriceHistory(
+                                game_id=game_id,
+                                store=shop_name,
+                                price=price,
+                                timestamp=timestamp
+                            )
+                        except (ValueError, KeyError) as e:
+                            continue
                         
-                        return history
-                    return []
-            except Exception as e:
-                print(f"Error en ITAD get_price_history: {e}")
-                return []
+                        if price < min_price:
+                            min_price = price
+                            min_indexes = [len(entries)]
+                        elif price == min_price:
+                            min_indexes.append(len(entries))
+                        entries.append(price_history)
+                    
+                    for index in min_indexes:
+                        entries[index] = replace(entries[index], is_historical_low=True)
+                    
+                    history.extend(entries)
+                
+                return history
+        except Exception as e:
+            logger.warning("Error en ITAD get_price_history: %s", e)
+            return []
     
     async def get_historical_low(self, game_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene el precio histórico más bajo de un juego."""
-        if not self.api_key:
+        if not self.enabled:
             return None
         
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/game/lowest"
-            params = {
-                "key": self.api_key,
-                "plains": game_id,
-                "region": "us",
-                "country": "US"
-            }
-            
-            try:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get(".data", {}).get(game_id)
-                    return None
-            except Exception as e:
-                print(f"Error en ITAD get_historical_low: {e}")
-                return None
+        session = self._get_session()
+        url = f"{self.base_url}/game/lowest"
+        params = {
+            "key": self.api_key,
+            "plains": game_id,
+            "region": "us",
+            "country": "US"
+        }
+        
+        try:
+            async with session.get(url, params=params) as response:
+                await check_response(response)
+                data = await response.json(loads=json_loads)
+                return data.get(".data", {}).get(game_id)
+        except Exception as e:
+            logger.warning("Error en ITAD get_historical_low: %s", e)
+            return None
 
 
 class APIManager:
     """Gestor unificado de APIs."""
     
     def __init__(self, itad_api_key: Optional[str] = None):
-        self.cheapshark = CheapSharkClient()
-        self.itad = ITADClient(itad_api_key)
+        self._session = SessionHolder()
+        self.cheapshark = CheapSharkClient(self._session.get)
+        self.itad = ITADClient(itad_api_key, self._session.get)
     
-    async def search_game_global(self, query: str) -> List[GameDeal]:
-        """Busca un juego en todas las plataformas disponibles."""
+    async def close(self):
+        """Cierra la sesión HTTP compartida."""
+        await self._session.close()
+    
+    def clear_cache(self):
+        """Descarta las respuestas cacheadas de todas las APIs."""
+        self.cheapshark._cache.clear()
+        self.itad._cache.clear()
+    
+    async def search_game_global(self, query: str, query_cf: Optional[str] = None) -> List[GameDeal]:
+        """
+        Busca un juego en todas las plataformas disponibles.
+        
+        `query_cf` es la consulta ya normalizada con casefold(), si el llamador
+        la tiene; se compara contra el título ya normalizado de cada oferta.
+        """
+        needle = query_cf if query_cf is not None else query.casefold()
+        found = await self._search_many([(query, needle)])
+        return found[query]
+    
+    async def search_games_global(self, queries: List[str],
+                                  max_concurrent: int = 8) -> Dict[str, List[GameDeal]]:
+        """
+        Busca varios juegos a la vez en todas las plataformas.
+        
+        Las búsquedas por nombre corren en paralelo (hasta `max_concurrent`),
+        pero los precios de ITAD de todos los juegos encontrados se piden juntos
+        con `get_current_prices_bulk`. Retorna las ofertas de cada consulta.
+        """
+        return await self._search_many([(query, query.casefold()) for query in queries],
+                                       max_concurrent)
+    
+    async def _search_many(self, queries: List[Tuple[str, str]],
+                           max_concurrent: int = 8) -> Dict[str, List[GameDeal]]:
+        """Busca cada (consulta, consulta normalizada) y reparte los precios de ITAD."""
+        semaphore = asyncio.Semaphore(max_concurrent)
+        
+        async def search(query: str, needle: str) -> Tuple[List[GameDeal], List[str]]:
+            async with semaphore:
+                return await asyncio.gather(self._search_cheapshark(query, needle),
+                                            self._search_itad_ids(query))
+        
+        results = await asyncio.gather(*(search(query, needle) for query, needle in queries))
+        
+        # Una sola consulta de precios para los juegos de ITAD de todas las búsquedas
+        prices: Dict[str, List[GameDeal]] = {}
+        itad_ids = [game_id for _, game_ids in results for game_id in game_ids]
+        if itad_ids:
+            try:
+                prices = await self.itad.get_current_prices_bulk(itad_ids)
+            except Exception as e:
+                logger.warning("Error buscando en ITAD: %s", e)
+        
+        found = {}
+        for (query, _), (all_deals, game_ids) in zip(queries, results):
+            for game_id in game_ids:
+                all_deals.extend(prices.get(game_id, []))
+            
+            # Eliminar duplicados basados en título y tienda (conserva la primera aparición)
+            unique_deals: Dict[Tuple[str, str], GameDeal] = {}
+            for deal in all_deals:
+                unique_deals.setdefault(deal._dedupe_key, deal)
+            found[query] = list(unique_deals.values())
+        
+        return found
+    
+    async def _search_cheapshark(self, query: str, needle: str) -> List[GameDeal]:
+        """Busca las ofertas de CheapShark cuyo juego coincide con la consulta."""
         all_deals = []
         
         # Buscar en CheapShark usando el endpoint de búsqueda
         try:
             cheapshark_games = await self.cheapshark.search_game(query)
             if cheapshark_games:
-                # Para cada juego encontrado, obtener sus deals
+                # Juegos encontrados con información disponible
+                game_ids = set()
                 for game in cheapshark_games[:5]:  # Limitar a 5 juegos para no sobrecargar
                     game_id = game.get("gameID", "")
-                    if game_id:
-                        # Obtener deals específicos del juego
-                        game_info = await self.cheapshark.get_game_info(game_id)
-                        if game_info:
-                            # Buscar deals que coincidan con este juego
-                            deals = await self.cheapshark.get_deals()
-                            for deal in deals:
-                                if str(deal.deal_id) == str(game_id) or query.lower() in deal.title.lower():
-                                    all_deals.append(deal)
+                    if game_id and await self.cheapshark.get_game_info(game_id):
+                        game_ids.add(str(game_id))
+                
+                if game_ids:
+                    # La lista de deals es la misma para todos los juegos: se pide y filtra una vez
+                    deals = await self.cheapshark.get_deals()
+                    for deal in deals:
+                        if str(deal.deal_id) in game_ids or needle in deal._dedupe_key[0]:
+                            all_deals.append(deal)
         except Exception as e:
-            print(f"Error buscando en CheapShark: {e}")
+            logger.warning("Error buscando en CheapShark: %s", e)
         
         # Si no encontramos nada en CheapShark, intentar obtener deals generales y filtrar
         if not all_deals:
             try:
                 cheapshark_deals = await self.cheapshark.get_deals()
-                query_lower = query.lower()
                 for deal in cheapshark_deals[:50]:  # Limitar a 50 deals para búsqueda
-                    if query_lower in deal.title.lower():
+                    if needle in deal._dedupe_key[0]:
                         all_deals.append(deal)
             except Exception as e:
-                print(f"Error en búsqueda alternativa de CheapShark: {e}")
+                logger.warning("Error en búsqueda alternativa de CheapShark: %s", e)
         
-        # Buscar en ITAD (solo si hay API key)
-        if self.itad.api_key:
-            try:
-                itad_games = await self.itad.search_game(query)
-                for game in itad_games[:5]:  # Limitar a 5 juegos
-                    game_id = game.get("id", "")
-                    if game_id:
-                        deals = await self.itad.get_current_prices(game_id)
-                        all_deals.extend(deals)
-            except Exception as e:
-                print(f"Error buscando en ITAD: {e}")
-        
-        # Eliminar duplicados basados en título y tienda
-        seen = set()
-        unique_deals = []
-        for deal in all_deals:
-            key = (deal.title.lower(), deal.store.lower())
-            if key not in seen:
-                seen.add(key)
-                unique_deals.append(deal)
+        return all_deals
+    
+    async def _search_itad_ids(self, query: str) -> List[str]:
+        """Busca en ITAD (solo si hay API key) los IDs de los juegos que coinciden."""
+        if not self.itad.enabled:
+            return []
         
-        return unique_deals
+        try:
+            itad_games = await self.itad.search_game(query)
+            return [g.get("id") for g in itad_games[:5] if g.get("id")]  # Limitar a 5 juegos
+        except Exception as e:
+            logger.warning("Error buscando en ITAD: %s", e)
+            return []
 
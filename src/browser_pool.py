@@ -0,0 +1,352 @@
+"""Pool de navegadores Chromium reutilizables para el scraper."""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright, Route
+
+from src.config import PLAYWRIGHT_HEADLESS
+
+logger = logging.getLogger(__name__)
+
+# Flags de Chromium que apagan subsistemas innecesarios para leer precios.
+# `--no-zygote` requiere el sandbox desactivado (`chromium_sandbox=False`).
+CHROMIUM_ARGS = [
+    "--no-zygote",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-accelerated-2d-canvas",
+    "--no-first-run",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-translate",
+]
+
+# Recursos que no aportan nada para leer precios y solo añaden peso a la página
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+# Dominios de analítica y publicidad (se bloquean también sus subdominios)
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+    "newrelic.com",
+    "nr-data.net",
+)
+
+
+def is_blocked_request(resource_type: str, url: str) -> bool:
+    """Indica si una petición del navegador debe abortarse."""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    
+    host = urlsplit(url).hostname or ""
+    return any(host == blocked or host.endswith("." + blocked) for blocked in BLOCKED_HOSTS)
+
+
+async def _route_request(route: Route):
+    """Aborta las peticiones bloqueadas y deja pasar el resto."""
+    request = route.request
+    if is_blocked_request(request.resource_type, request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+# Borra el almacenamiento del origen de la página (falla en páginas sin origen)
+_CLEAR_STORAGE_JS = """
+() => {
+    try {
+        localStorage.clear();
+        sessionStorage.clear();
+    } catch (e) {}
+}
+"""
+
+
+class BrowserPool:
+    """
+    Mantiene hasta `max_size` navegadores Chromium abiertos entre scrapes.
+    
+    Cada tarea recibe su propio `BrowserContext` (cookies, caché y conexiones
+    aisladas) sobre un navegador ya iniciado, de modo que el arranque de Chromium
+    se paga una vez. Con `block_resources`, el contexto no descarga imágenes,
+    fuentes, hojas de estilo ni analítica. Hasta `max_contexts` contextos trabajan en paralelo,
+    repartidos entre los navegadores. Al liberarse, un contexto se limpia (cookies,
+    almacenamiento y página en `about:blank`) y queda abierto con su página para
+    el siguiente scrape, hasta `max_context_uses` usos.
+    Un navegador se recicla tras `max_uses` contextos y todos se cierran tras
+    `idle_timeout` segundos sin uso. Como la sesión HTTP compartida, el pool se
+    reinicia si cambia el event loop.
+    """
+    
+    def __init__(self, max_size: int = 2, max_contexts: Optional[int] = None,
+                 max_uses: int = 50, max_context_uses: int = 20, idle_timeout: float = 300,
+                 headless: bool = PLAYWRIGHT_HEADLESS, block_resources: bool = True):
+        self.max_size = max_size
+        self.max_contexts = max_contexts or os.cpu_count() or 4
+        self.max_uses = max_uses
+        self.max_context_uses = max_context_uses
+        self.idle_timeout = idle_timeout
+        self.headless = headless
+        self.block_resources = block_resources
+        self._reset()
+    
+    def _reset(self):
+        """Olvida todo el estado ligado al event loop anterior."""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._playwright: Optional[Playwright] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # Contextos abiertos y contextos entregados por cada navegador vivo
+        self._active: Dict[Browser, int] = {}
+        self._uses: Dict[Browser, int] = {}
+        self._owners: Dict[BrowserContext, Browser] = {}
+        # Contextos libres que conservan su página abierta, y sus usos
+        self._warm: List[BrowserContext] = []
+        self._context_uses: Dict[BrowserContext, int] = {}
+        self._idle_task: Optional[asyncio.Task] = None
+    
+    def _bind_loop(self):
+        """Prepara el estado del pool para el loop activo si cambió."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset()
+            self._loop = loop
+            self._start_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_contexts)
+    
+    async def _ensure_started(self):
+        """Inicia Playwright si aún no se hizo. Requiere `_start_lock`."""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+    
+    async def _launch(self) -> Browser:
+        """
+        Lanza un nuevo navegador Chromium.
+        
+        Ctrl+C no mata el navegador directamente: el proceso lo cierra con `close()`.
+        """
+        browser = await self._playwright.chromium.launch(
+            headless=self.headless,
+            args=CHROMIUM_ARGS,
+            handle_sigint=False,
+            chromium_sandbox=False
+        )
+        self._active[browser] = 0
+        self._uses[browser] = 0
+        return browser
+    
+    def _forget(self, browser: Browser):
+        """Deja de asignar contextos a un navegador."""
+        self._active.pop(browser, None)
+        self._uses.pop(browser, None)
+    
+    def _pick_browser(self) -> Optional[Browser]:
+        """
+        Elige el navegador menos cargado que aún no deba reciclarse.
+        
+        Retorna None si conviene lanzar uno nuevo.
+        """
+        for browser in [b for b in self._active if not b.is_connected()]:
+            self._forget(browser)
+        
+        candidates = [b for b in self._active if self._uses[b] < self.max_uses]
+        if not candidates:
+            return None
+        
+        browser = min(candidates, key=self._active.__getitem__)
+        if self._active[browser] and len(self._active) < self.max_size:
+            return None
+        return browser
+    
+    def _take_warm(self) -> Optional[BrowserContext]:
+        """Retorna un contexto libre cuyo navegador siga conectado, si lo hay."""
+        while self._warm:
+            context = self._warm.pop()
+            if self._owners[context].is_connected():
+                return context
+            self._drop_context(context)
+        return None
+    
+    def _drop_context(self, context: BrowserContext) -> Optional[Browser]:
+        """Deja de contar un contexto abierto y retorna su navegador."""
+        self._context_uses.pop(context, None)
+        browser = self._owners.pop(context, None)
+        if browser in self._active:
+            self._active[browser] -= 1
+        return browser
+    
+    async def acquire_context(self) -> BrowserContext:
+        """
+        Obtiene un contexto del pool, reutilizando uno libre si existe.
+        
+        Espera si ya hay `max_contexts` contextos en uso. El contexto debe
+        devolverse con `release_context`.
+        """
+        self._bind_loop()
+        if self._idle_task:
+            self._idle_task.cancel()
+            self._idle_task = None
+        
+        await self._slots.acquire()
+        try:
+            # Bajo el lock, para no intercalarse con un `close()` en curso
+            async with self._start_lock:
+                context = self._take_warm()
+                if context is None:
+                    await self._ensure_started()
+                    browser = self._pick_browser() or await self._launch()
+                    self._active[browser] += 1
+                    self._uses[browser] += 1
+            
+            if context is None:
+                try:
+                    context = await browser.new_context()
+                    if self.block_resources:
+                        # Se registra en el contexto, una sola vez, y no en cada página
+                        await context.route("**/*", _route_request)
+                except BaseException:
+                    if browser in self._active:
+                        self._active[browser] -= 1
+                    raise
+                
+                self._owners[context] = browser
+                self._context_uses[context] = 0
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        self._context_uses[context] += 1
+        return context
+    
+    async def release_context(self, context: BrowserContext, reuse: bool = True):
+        """
+        Devuelve el contexto al pool.
+        
+        Con `reuse`, el contexto queda abierto para el siguiente scrape salvo
+        que haya agotado sus usos o su navegador deba reciclarse; si no, se cierra.
+        """
+        try:
+            browser = self._owners.get(context)
+            if browser is not None:
+                retiring = (self._uses.get(browser, self.max_uses) >= self.max_uses
+                            or not browser.is_connected())
+                if (reuse and not retiring and self._context_uses[context] < self.max_context_uses
+                        and await self._reset_context(context)):
+                    self._warm.append(context)
+                    return
+            
+            self._drop_context(context)
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning("Error cerrando contexto del navegador: %s", e)
+            
+            # Un contexto de un pool ya cerrado no tiene navegador que reciclar
+            if browser in self._active:
+                retiring = self._uses[browser] >= self.max_uses or not browser.is_connected()
+                if retiring and not self._active[browser]:
+                    # Reciclar el navegador para acotar la memoria acumulada
+                    self._forget(browser)
+                    await self._close_browser(browser)
+        finally:
+            # El cupo se devuelve siempre, incluso si el pool se cerró entretanto
+            self._slots.release()
+            self._schedule_idle_close()
+    
+    async def _reset_context(self, context: BrowserContext) -> bool:
+        """
+        Limpia un contexto antes de reutilizarlo para otra URL.
+        
+        Borra el almacenamiento del último sitio, deja las páginas en
+        `about:blank` y elimina las cookies, así el estado de una tienda (edad
+        verificada, región, sesión) no pasa al siguiente scrape. Retorna False
+        si no se pudo limpiar y el contexto debe cerrarse.
+        """
+        try:
+            for page in context.pages:
+                await page.evaluate(_CLEAR_STORAGE_JS)
+                await page.goto("about:blank")
+            await context.clear_cookies()
+            return True
+        except Exception as e:
+            logger.warning("Error limpiando contexto del navegador: %s", e)
+            return False
+    
+    def _schedule_idle_close(self):
+        """Programa el cierre por inactividad si ningún contexto está en uso."""
+        if len(self._owners) == len(self._warm):
+            if self._idle_task:
+                self._idle_task.cancel()
+            self._idle_task = asyncio.create_task(self._close_when_idle())
+    
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[BrowserContext]:
+        """
+        Context manager que adquiere y libera un contexto del pool.
+        
+        Si el bloque falla, el contexto se cierra en vez de reutilizarse.
+        """
+        context = await self.acquire_context()
+        try:
+            yield context
+        except BaseException:
+            await self.release_context(context, reuse=False)
+            raise
+        await self.release_context(context)
+    
+    async def _close_when_idle(self):
+        """Cierra los navegadores si el pool sigue sin uso tras `idle_timeout`."""
+        await asyncio.sleep(self.idle_timeout)
+        # A partir de aquí el cierre no debe cancelarse a medias
+        self._idle_task = None
+        async with self._start_lock:
+            if len(self._owners) == len(self._warm):
+                await self._shutdown()
+    
+    async def _close_browser(self, browser: Browser):
+        """Cierra un navegador ignorando errores de desconexión."""
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning("Error cerrando navegador: %s", e)
+    
+    async def close(self):
+        """Cierra todos los navegadores y detiene Playwright."""
+        if self._loop is not asyncio.get_running_loop():
+            self._reset()
+            return
+        
+        if self._idle_task:
+            self._idle_task.cancel()
+        self._idle_task = None
+        
+        async with self._start_lock:
+            await self._shutdown()
+    
+    async def _shutdown(self):
+        """Cierra navegadores y Playwright. Requiere `_start_lock`."""
+        for browser in list(self._active):
+            await self._close_browser(browser)
+        self._active.clear()
+        self._uses.clear()
+        self._owners.clear()
+        self._warm.clear()
+        self._context_uses.clear()
+        
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# Pool compartido por todo el proceso
+browser_pool = BrowserPool()
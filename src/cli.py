@@ -1,6 +1,7 @@
 """Interfaz de línea de comandos usando Rich."""
 
 import asyncio
+from datetime import datetime
 from typing import List, Optional
 from rich.console import Console
 from rich.table import Table
@@ -19,6 +20,20 @@ from src.notifier import Notifier
 console = Console()
 
 
+def render_to_text(renderable) -> str:
+    """Renderiza un elemento de Rich a texto con sus códigos ANSI."""
+    with console.capture() as capture:
+        console.print(renderable)
+    return capture.get()
+
+
+async def print_rendered(renderable):
+    """Renderiza fuera del event loop y escribe la salida en una sola llamada."""
+    text = await asyncio.to_thread(render_to_text, renderable)
+    console.file.write(text)
+    console.file.flush()
+
+
 class CLI:
     """Interfaz de línea de comandos."""
     
@@ -29,7 +44,7 @@ class CLI:
         self.analyzer = DealAnalyzer(self.db)
         self.notifier = Notifier()
     
-    def display_deals_table(self, deals: List[GameDeal], title: str = "Ofertas Encontradas"):
+    async def display_deals_table(self, deals: List[GameDeal], title: str = "Ofertas Encontradas"):
         """Muestra una tabla de ofertas."""
         if not deals:
             console.print("[yellow]No se encontraron ofertas.[/yellow]")
@@ -57,9 +72,9 @@ class CLI:
                 deal.url[:60]  # Limitar longitud
             )
         
-        console.print(table)
+        await print_rendered(table)
     
-    def display_watchlist(self):
+    async def display_watchlist(self):
         """Muestra la watchlist actual."""
         watchlist = self.watchlist_manager.get_games()
         
@@ -86,7 +101,7 @@ class CLI:
                 str(last_checked)
             )
         
-        console.print(table)
+        await print_rendered(table)
     
     def display_amazing_deals(self):
         """Muestra ofertas imperdibles guardadas."""
@@ -111,7 +126,7 @@ class CLI:
                 f"${deal['price']:.2f}",
                 f"{deal['discount_percent']:.1f}%",
                 deal['reason'],
-                str(deal['timestamp'])
+                str(datetime.fromtimestamp(deal['timestamp']))
             )
         
         console.print(table)
@@ -124,11 +139,11 @@ class CLI:
             console=console
         ) as progress:
             task = progress.add_task(f"Buscando '{query}'...", total=None)
-            deals = await self.api_manager.search_game_global(query)
+            deals = await self.api_manager.search_game_global(query, query.casefold())
             progress.update(task, completed=True)
         
         if deals:
-            self.display_deals_table(deals, f"Resultados para: {query}")
+            await self.display_deals_table(deals, f"Resultados para: {query}")
             
             # Analizar ofertas imperdibles
             amazing_deals = []
@@ -179,6 +194,9 @@ class CLI:
         
         console.print(f"[cyan]Verificando {len(watchlist)} juego(s) en la watchlist...[/cyan]")
         
+        # Una verificación pedida a mano no debe reutilizar respuestas cacheadas
+        self.api_manager.clear_cache()
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
@@ -221,12 +239,12 @@ class CLI:
             # Mostrar ofertas que cumplen precio objetivo
             if target_deals:
                 console.print("\n[bold yellow]🎯 PRECIOS OBJETIVO ALCANZADOS:[/bold yellow]")
-                self.display_deals_table(target_deals, "Precios Objetivo")
+                await self.display_deals_table(target_deals, "Precios Objetivo")
             
             # Mostrar otras ofertas
             if normal_deals:
                 console.print("\n[bold cyan]📊 OTRAS OFERTAS:[/bold cyan]")
-                self.display_deals_table(normal_deals, "Ofertas Encontradas")
+                await self.display_deals_table(normal_deals, "Ofertas Encontradas")
         else:
             console.print("[yellow]No se encontraron ofertas para los juegos en la watchlist.[/yellow]")
     
@@ -250,39 +268,43 @@ class CLI:
     
     async def run(self):
         """Ejecuta la CLI."""
-        while True:
-            self.show_menu()
-            choice = Prompt.ask("\n[bold cyan]Selecciona una opción[/bold cyan]", choices=["1", "2", "3", "4", "5", "6", "7"])
-            
-            if choice == "1":
-                query = Prompt.ask("Nombre del juego a buscar")
-                await self.search_game(query)
-            
-            elif choice == "2":
-                self.display_watchlist()
-            
-            elif choice == "3":
-                await self.add_to_watchlist()
-            
-            elif choice == "4":
-                game_title = Prompt.ask("Nombre del juego a eliminar")
-                store = Prompt.ask("Tienda (opcional, presiona Enter para omitir)", default="")
-                store = store if store else None
+        try:
+            while True:
+                self.show_menu()
+                choice = Prompt.ask("\n[bold cyan]Selecciona una opción[/bold cyan]", choices=["1", "2", "3", "4", "5", "6", "7"])
                 
-                if self.watchlist_manager.remove_game(game_title, store):
-                    console.print(f"[green]✓[/green] '{game_title}' eliminado de la watchlist")
-                else:
-                    console.print(f"[red]✗[/red] Error al eliminar '{game_title}'")
-            
-            elif choice == "5":
-                await self.check_watchlist()
-            
-            elif choice == "6":
-                self.display_amazing_deals()
-            
-            elif choice == "7":
-                console.print("[yellow]¡Hasta luego![/yellow]")
-                break
-            
-            console.print()  # Línea en blanco
-
+                if choice == "1":
+                    query = Prompt.ask("Nombre del juego a buscar")
+                    await self.search_game(query)
+                
+                elif choice == "2":
+                    await self.display_watchlist()
+                
+                elif choice == "3":
+                    await self.add_to_watchlist()
+                
+                elif choice == "4":
+                    game_title = Prompt.ask("Nombre del juego a eliminar")
+                    store = Prompt.ask("Tienda (opcional, presiona Enter para omitir)", default="")
+                    store = store if store else None
+                    
+                    if self.watchlist_manager.remove_game(game_title, store):
+                        console.print(f"[green]✓[/green] '{game_title}' eliminado de la watchlist")
+                    else:
+                        console.print(f"[red]✗[/red] Error al eliminar '{game_title}'")
+                
+                elif choice == "5":
+                    await self.check_watchlist()
+                
+                elif choice == "6":
+                    self.display_amazing_deals()
+                
+                elif choice == "7":
+                    console.print("[yellow]¡Hasta luego![/yellow]")
+                    break
+                
+                console.print()  # Línea en blanco
+        finally:
+            await self.api_manager.close()
+            await self.notifier.close()
+            await self.watchlist_manager.close()
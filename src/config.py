@@ -31,6 +31,7 @@ TELEGRAM_CHAT_ID: Optional[str] = os.getenv("TELEGRAM_CHAT_ID")
 # Configuración de scraping
 PLAYWRIGHT_HEADLESS = True
 PLAYWRIGHT_TIMEOUT = 30000  # 30 segundos
+SCRAPE_CACHE_TTL_SECONDS = 30 * 60  # Vigencia de un precio scrapeado (30 minutos)
 
 # Scheduler
 CHECK_INTERVAL_HOURS = 6
@@ -1,424 +1,800 @@
 """Gestión de base de datos SQLite."""
 
+import asyncio
+import logging
+import queue
 import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import json
 
-from src.config import DB_PATH
+from src.config import DB_PATH, SCRAPE_CACHE_TTL_SECONDS
 from src.api_clients import GameDeal, PriceHistory
 
+logger = logging.getLogger(__name__)
+
+
+def to_epoch(value: datetime) -> int:
+    """Convierte una fecha al entero (segundos Unix) que se guarda en las columnas `timestamp`."""
+    return int(value.timestamp())
+
+# Entradas máximas en la caché en memoria de mínimos históricos
+HISTORICAL_LOW_CACHE_SIZE = 1000
+
+# Conexiones de solo lectura que se mantienen abiertas para lecturas concurrentes
+READ_POOL_SIZE = 4
+
+# Versión del esquema; incrementarla al modificar SCHEMA_SQL
+SCHEMA_VERSION = 6
+
+# Las columnas `timestamp` guardan segundos Unix (INTEGER); hasta la versión 2
+# eran DATETIME (texto ISO). Columnas de cada tabla que se copian al migrar.
+TIMESTAMP_MIGRATION_COLUMNS = {
+    "price_history": "id, game_id, game_title, store, price, original_price, "
+                     "discount_percent, deal_id, url",
+    "amazing_deals": "id, game_title, store, price, original_price, discount_percent, "
+                     "url, deal_id, reason, notified",
+    "historical_lows": "id, game_id, game_title, store, lowest_price",
+}
+
+SCHEMA_TABLES_SQL = """
+    -- Tabla de historial de precios
+    CREATE TABLE IF NOT EXISTS price_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id TEXT NOT NULL,
+        game_title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        price REAL NOT NULL,
+        original_price REAL NOT NULL,
+        discount_percent REAL NOT NULL,
+        deal_id TEXT,
+        url TEXT,
+        timestamp INTEGER NOT NULL,
+        UNIQUE(game_id, store, timestamp)
+    );
+
+    -- Tabla de watchlist
+    CREATE TABLE IF NOT EXISTS watchlist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_title TEXT NOT NULL,
+        game_id TEXT,
+        target_price REAL,
+        store TEXT,
+        created_at DATETIME NOT NULL,
+        last_checked DATETIME,
+        is_active INTEGER DEFAULT 1,
+        UNIQUE(game_title, store)
+    );
+
+    -- Tabla de ofertas imperdibles
+    CREATE TABLE IF NOT EXISTS amazing_deals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        price REAL NOT NULL,
+        original_price REAL NOT NULL,
+        discount_percent REAL NOT NULL,
+        url TEXT NOT NULL,
+        deal_id TEXT,
+        reason TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        notified INTEGER DEFAULT 0
+    );
+
+    -- Tabla de precios históricos mínimos
+    CREATE TABLE IF NOT EXISTS historical_lows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id TEXT NOT NULL,
+        game_title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        lowest_price REAL NOT NULL,
+        timestamp INTEGER NOT NULL,
+        UNIQUE(game_id, store)
+    );
+
+    -- Caché de precios obtenidos por scraping, ya parseados
+    CREATE TABLE IF NOT EXISTS scrape_cache (
+        url TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        price REAL NOT NULL,
+        original_price REAL NOT NULL,
+        discount_percent REAL NOT NULL,
+        timestamp INTEGER NOT NULL,
+        fetched_at INTEGER NOT NULL
+    );
+
+    -- Selectores CSS que funcionaron en cada dominio, para leer el HTML sin navegador
+    CREATE TABLE IF NOT EXISTS scrape_patterns (
+        domain TEXT PRIMARY KEY,
+        title_selector TEXT,
+        price_selector TEXT NOT NULL,
+        original_price_selector TEXT,
+        failures INTEGER NOT NULL DEFAULT 0,
+        updated_at INTEGER NOT NULL
+    );
+"""
+
+SCHEMA_INDEXES_SQL = """
+    -- Índices para mejorar rendimiento
+    CREATE INDEX IF NOT EXISTS idx_price_history_game_store 
+    ON price_history(game_id, store);
+
+    CREATE INDEX IF NOT EXISTS idx_price_history_timestamp 
+    ON price_history(timestamp);
+
+    CREATE INDEX IF NOT EXISTS idx_watchlist_active 
+    ON watchlist(is_active);
+
+    CREATE INDEX IF NOT EXISTS idx_amazing_deals_timestamp 
+    ON amazing_deals(timestamp);
+
+    CREATE INDEX IF NOT EXISTS idx_amazing_deals_notified_ts 
+    ON amazing_deals(notified, timestamp DESC);
+"""
+
+SCHEMA_SQL = SCHEMA_TABLES_SQL + SCHEMA_INDEXES_SQL
+
+# Las marcas de tiempo tienen resolución de segundos y las ofertas de una misma
+# respuesta la comparten: de varias del mismo juego y tienda en el mismo segundo
+# se conserva la de menor precio, en lugar de descartar las demás en silencio
+PRICE_HISTORY_CONFLICT_SQL = """
+    ON CONFLICT(game_id, store, timestamp) DO UPDATE SET
+        game_title = excluded.game_title,
+        price = excluded.price,
+        original_price = excluded.original_price,
+        discount_percent = excluded.discount_percent,
+        deal_id = excluded.deal_id,
+        url = excluded.url
+    WHERE excluded.price < price_history.price
+"""
+
+INSERT_PRICE_HISTORY_SQL = """
+    INSERT INTO price_history 
+    (game_id, game_title, store, price, original_price, discount_percent, 
+     deal_id, url, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+""" + PRICE_HISTORY_CONFLICT_SQL
+
+INSERT_AMAZING_DEAL_SQL = """
+    INSERT INTO amazing_deals 
+    (game_title, store, price, original_price, discount_percent, 
+     url, deal_id, reason, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPDATE_WATCHLIST_CHECK_SQL = """
+    UPDATE watchlist
+    SET last_checked = ?
+    WHERE game_title = ? AND (? IS NULL OR store = ?) AND is_active = 1
+"""
+
+MARK_DEAL_NOTIFIED_SQL = """
+    UPDATE amazing_deals
+    SET notified = 1
+    WHERE id = ?
+"""
+
 
 class Database:
     """Gestor de base de datos SQLite."""
     
     def __init__(self, db_path: Path = DB_PATH):
+        # No se hace I/O aquí: la conexión y el esquema se preparan en el primer uso
         self.db_path = db_path
-        self._init_database()
+        self._lock = threading.RLock()
+        self._hl_cache: "OrderedDict[Tuple[str, Optional[str]], Optional[Dict[str, Any]]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=READ_POOL_SIZE)
     
-    def _init_database(self):
-        """Inicializa las tablas de la base de datos."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabla de historial de precios
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS price_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_id TEXT NOT NULL,
-                game_title TEXT NOT NULL,
-                store TEXT NOT NULL,
-                price REAL NOT NULL,
-                original_price REAL NOT NULL,
-                discount_percent REAL NOT NULL,
-                deal_id TEXT,
-                url TEXT,
-                timestamp DATETIME NOT NULL,
-                UNIQUE(game_id, store, timestamp)
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexión persistente; se abre e inicializa el esquema en el primer acceso."""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = self._connect()
+                    self._init_database(conn)
+                    self._conn = conn
+                    self.evict_cached(SCRAPE_CACHE_TTL_SECONDS)
+        return self._conn
+    
+    async def ensure_schema(self):
+        """Abre la conexión e inicializa el esquema en un hilo aparte."""
+        await asyncio.to_thread(lambda: self.conn)
+    
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Abre una conexión y aplica los PRAGMAs de rendimiento."""
+        if read_only:
+            conn = sqlite3.connect(
+                f"{Path(self.db_path).resolve().as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=256
             )
-        """)
-        
-        # Tabla de watchlist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS watchlist (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_title TEXT NOT NULL,
-                game_id TEXT,
-                target_price REAL,
-                store TEXT,
-                created_at DATETIME NOT NULL,
-                last_checked DATETIME,
-                is_active INTEGER DEFAULT 1,
-                UNIQUE(game_title, store)
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=256
             )
-        """)
+            # El modo WAL es persistente en el archivo; lo fija la conexión de escritura
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+    
+    @contextmanager
+    def _reader(self):
+        """
+        Presta una conexión de solo lectura del pool.
         
-        # Tabla de ofertas imperdibles
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS amazing_deals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_title TEXT NOT NULL,
-                store TEXT NOT NULL,
-                price REAL NOT NULL,
-                original_price REAL NOT NULL,
-                discount_percent REAL NOT NULL,
-                url TEXT NOT NULL,
-                deal_id TEXT,
-                reason TEXT NOT NULL,
-                timestamp DATETIME NOT NULL,
-                notified INTEGER DEFAULT 0
-            )
-        """)
+        Con WAL, las lecturas no bloquean a la conexión de escritura ni entre sí,
+        así que no toman el lock de la conexión persistente.
+        """
+        self.conn  # Asegura que el archivo y el esquema existan
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect(read_only=True)
         
-        # Tabla de precios históricos mínimos
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS historical_lows (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                game_id TEXT NOT NULL,
-                game_title TEXT NOT NULL,
-                store TEXT NOT NULL,
-                lowest_price REAL NOT NULL,
-                timestamp DATETIME NOT NULL,
-                UNIQUE(game_id, store)
-            )
-        """)
+        try:
+            yield conn
+        finally:
+            try:
+                self._read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    def close(self):
+        """Cierra la conexión con la base de datos."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
+    def _init_database(self, conn: sqlite3.Connection):
+        """
+        Inicializa las tablas de la base de datos.
         
-        # Índices para mejorar rendimiento
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_price_history_game_store 
-            ON price_history(game_id, store)
-        """)
+        El esquema completo se aplica en un solo executescript y se marca con
+        `PRAGMA user_version`; en arranques posteriores no se ejecuta DDL.
+        """
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_price_history_timestamp 
-            ON price_history(timestamp)
-        """)
+        # La caché de scraping es desechable: se recrea con el esquema actual
+        conn.execute("DROP TABLE IF EXISTS scrape_cache")
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_watchlist_active 
-            ON watchlist(is_active)
-        """)
+        legacy_tables = [
+            table for table in TIMESTAMP_MIGRATION_COLUMNS
+            if any(column["name"] == "timestamp" and column["type"] != "INTEGER"
+                   for column in conn.execute(f"PRAGMA table_info({table})"))
+        ]
+        if not legacy_tables:
+            conn.executescript(SCHEMA_SQL)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            return
         
-        conn.commit()
-        conn.close()
+        # Reconstruye las tablas con `timestamp` DATETIME en una sola transacción.
+        # Los textos ISO se guardaron en hora local, de ahí el modificador 'utc'.
+        script = ["BEGIN;"]
+        script += [f"ALTER TABLE {table} RENAME TO {table}_old;" for table in legacy_tables]
+        script.append(SCHEMA_TABLES_SQL)
+        for table in legacy_tables:
+            columns = TIMESTAMP_MIGRATION_COLUMNS[table]
+            # Al truncar a segundos, filas distintas del historial pueden coincidir
+            if table == "price_history":
+                insert, conflict = "INSERT INTO", "WHERE true" + PRICE_HISTORY_CONFLICT_SQL
+            else:
+                insert, conflict = "INSERT OR IGNORE INTO", ""
+            script.append(f"""
+                {insert} {table} ({columns}, timestamp)
+                SELECT {columns},
+                       CASE WHEN typeof(timestamp) = 'integer' THEN timestamp
+                            ELSE CAST(strftime('%s', timestamp, 'utc') AS INTEGER) END
+                FROM {table}_old
+                {conflict};
+                DROP TABLE {table}_old;
+            """)
+        script.append(SCHEMA_INDEXES_SQL)
+        script.append(f"PRAGMA user_version = {SCHEMA_VERSION};")
+        script.append("COMMIT;")
+        conn.executescript("\n".join(script))
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa las sentencias del bloque en una sola transacción.
+        
+        Hace COMMIT al salir del bloque y ROLLBACK si se lanza una excepción.
+        Dentro de una transacción ya abierta, el bloque se une a ella.
+        """
+        with self._lock:
+            if self.conn.in_transaction:
+                yield
+                return
+            
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+    
+    @staticmethod
+    def _price_history_row(deal: GameDeal, game_id: Optional[str] = None) -> tuple:
+        """Construye los parámetros de INSERT_PRICE_HISTORY_SQL para una oferta."""
+        return (
+            game_id or deal.deal_id,
+            deal.title,
+            deal.store,
+            deal.price,
+            deal.original_price,
+            deal.discount_percent,
+            deal.deal_id,
+            deal.url,
+            to_epoch(deal.timestamp)
+        )
     
     def add_price_history(self, deal: GameDeal, game_id: Optional[str] = None) -> bool:
         """Agrega un registro al historial de precios."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            try:
+                self.conn.execute(INSERT_PRICE_HISTORY_SQL, self._price_history_row(deal, game_id))
+                
+                return True
+            except sqlite3.Error as e:
+                logger.error("Error agregando historial de precios: %s", e)
+                return False
+    
+    def add_price_history_many(self, pairs: List[Tuple[GameDeal, Optional[str]]]) -> bool:
+        """Agrega varios registros al historial de precios en una sola transacción."""
+        rows = [self._price_history_row(deal, game_id) for deal, game_id in pairs]
+        if not rows:
+            return True
         
         try:
-            cursor.execute("""
-                INSERT OR IGNORE INTO price_history 
-                (game_id, game_title, store, price, original_price, discount_percent, 
-                 deal_id, url, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                game_id or deal.deal_id,
-                deal.title,
-                deal.store,
-                deal.price,
-                deal.original_price,
-                deal.discount_percent,
-                deal.deal_id,
-                deal.url,
-                deal.timestamp
-            ))
+            with self.transaction():
+                self.conn.executemany(INSERT_PRICE_HISTORY_SQL, rows)
             
-            conn.commit()
             return True
         except sqlite3.Error as e:
-            print(f"Error agregando historial de precios: {e}")
+            logger.error("Error agregando historial de precios: %s", e)
             return False
-        finally:
-            conn.close()
     
     def get_price_history(self, game_id: str, store: Optional[str] = None, 
                          limit: int = 100) -> List[Dict[str, Any]]:
         """Obtiene el historial de precios de un juego."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        try:
-            if store:
-                cursor.execute("""
+        with self._reader() as conn:
+            try:
+                store = store or None
+                cursor = conn.execute("""
                     SELECT * FROM price_history
-                    WHERE game_id = ? AND store = ?
+                    WHERE game_id = ? AND (? IS NULL OR store = ?)
                     ORDER BY timestamp DESC
                     LIMIT ?
-                """, (game_id, store, limit))
-            else:
-                cursor.execute("""
-                    SELECT * FROM price_history
-                    WHERE game_id = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (game_id, limit))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
-        except sqlite3.Error as e:
-            print(f"Error obteniendo historial: {e}")
-            return []
-        finally:
-            conn.close()
+                """, (game_id, store, store, limit))
+                
+                rows = cursor.fetchall()
+                return [dict(row) for row in rows]
+            except sqlite3.Error as e:
+                logger.error("Error obteniendo historial: %s", e)
+                return []
     
     def get_lowest_price(self, game_id: str, store: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Obtiene el precio más bajo registrado para un juego."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        try:
-            if store:
-                cursor.execute("""
+        with self._lock:
+            try:
+                store = store or None
+                cursor = self.conn.execute("""
                     SELECT * FROM price_history
-                    WHERE game_id = ? AND store = ?
+                    WHERE game_id = ? AND (? IS NULL OR store = ?)
                     ORDER BY price ASC
                     LIMIT 1
-                """, (game_id, store))
-            else:
-                cursor.execute("""
-                    SELECT * FROM price_history
-                    WHERE game_id = ?
-                    ORDER BY price ASC
-                    LIMIT 1
-                """, (game_id,))
-            
-            row = cursor.fetchone()
-            return dict(row) if row else None
-        except sqlite3.Error as e:
-            print(f"Error obteniendo precio mínimo: {e}")
-            return None
-        finally:
-            conn.close()
+                """, (game_id, store, store))
+                
+                row = cursor.fetchone()
+                return dict(row) if row else None
+            except sqlite3.Error as e:
+                logger.error("Error obteniendo precio mínimo: %s", e)
+                return None
     
     def add_to_watchlist(self, game_title: str, game_id: Optional[str] = None,
                         target_price: Optional[float] = None, store: Optional[str] = None) -> bool:
         """Agrega un juego a la watchlist."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO watchlist 
-                (game_title, game_id, target_price, store, created_at, is_active)
-                VALUES (?, ?, ?, ?, ?, 1)
-            """, (game_title, game_id, target_price, store, datetime.now()))
-            
-            conn.commit()
-            return True
-        except sqlite3.Error as e:
-            print(f"Error agregando a watchlist: {e}")
-            return False
-        finally:
-            conn.close()
+        with self._lock:
+            try:
+                self.conn.execute("""
+                    INSERT INTO watchlist 
+                    (game_title, game_id, target_price, store, created_at, is_active)
+                    VALUES (?, ?, ?, ?, ?, 1)
+                    ON CONFLICT(game_title, store) DO UPDATE SET
+                        target_price = excluded.target_price,
+                        game_id = excluded.game_id,
+                        is_active = 1
+                """, (game_title, game_id, target_price, store, datetime.now()))
+                
+                return True
+            except sqlite3.Error as e:
+                logger.error("Error agregando a watchlist: %s", e)
+                return False
     
     def get_watchlist(self, active_only: bool = True) -> List[Dict[str, Any]]:
         """Obtiene la lista de juegos en watchlist."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        try:
-            if active_only:
-                cursor.execute("""
-                    SELECT * FROM watchlist
-                    WHERE is_active = 1
-                    ORDER BY created_at DESC
-                """)
-            else:
-                cursor.execute("""
-                    SELECT * FROM watchlist
-                    ORDER BY created_at DESC
-                """)
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
-        except sqlite3.Error as e:
-            print(f"Error obteniendo watchlist: {e}")
-            return []
-        finally:
-            conn.close()
+        with self._reader() as conn:
+            try:
+                if active_only:
+                    cursor = conn.execute("""
+                        SELECT * FROM watchlist
+                        WHERE is_active = 1
+                        ORDER BY created_at DESC
+                    """)
+                else:
+                    cursor = conn.execute("""
+                        SELECT * FROM watchlist
+                        ORDER BY created_at DESC
+                    """)
+                
+                rows = cursor.fetchall()
+                return [dict(row) for row in rows]
+            except sqlite3.Error as e:
+                logger.error("Error obteniendo watchlist: %s", e)
+                return []
     
     def remove_from_watchlist(self, game_title: str, store: Optional[str] = None) -> bool:
         """Elimina un juego de la watchlist."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            if store:
-                cursor.execute("""
+        with self._lock:
+            try:
+                store = store or None
+                cursor = self.conn.execute("""
                     UPDATE watchlist
                     SET is_active = 0
-                    WHERE game_title = ? AND store = ?
-                """, (game_title, store))
-            else:
-                cursor.execute("""
-                    UPDATE watchlist
-                    SET is_active = 0
-                    WHERE game_title = ?
-                """, (game_title,))
-            
-            conn.commit()
-            return cursor.rowcount > 0
-        except sqlite3.Error as e:
-            print(f"Error eliminando de watchlist: {e}")
-            return False
-        finally:
-            conn.close()
+                    WHERE game_title = ? AND (? IS NULL OR store = ?)
+                """, (game_title, store, store))
+                
+                return cursor.rowcount > 0
+            except sqlite3.Error as e:
+                logger.error("Error eliminando de watchlist: %s", e)
+                return False
+    
+    def update_watchlist_check(self, game_title: str, store: Optional[str] = None,
+                               now: Optional[datetime] = None):
+        """
+        Actualiza la fecha de última verificación de un juego en watchlist.
+        
+        `now` permite reutilizar una misma marca de tiempo para todo un ciclo.
+        """
+        with self._lock:
+            try:
+                store = store or None
+                self.conn.execute(UPDATE_WATCHLIST_CHECK_SQL, (now or datetime.now(), game_title, store, store))
+            except sqlite3.Error as e:
+                logger.error("Error actualizando check de watchlist: %s", e)
     
-    def update_watchlist_check(self, game_title: str, store: Optional[str] = None):
-        """Actualiza la fecha de última verificación de un juego en watchlist."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def update_watchlist_checks_many(self, items: List[Tuple[str, Optional[str]]],
+                                     now: Optional[datetime] = None):
+        """Actualiza la última verificación de varios (título, tienda) en una sola transacción."""
+        if not items:
+            return
         
+        now = now or datetime.now()
+        rows = [(now, game_title, store or None, store or None) for game_title, store in items]
         try:
-            if store:
-                cursor.execute("""
-                    UPDATE watchlist
-                    SET last_checked = ?
-                    WHERE game_title = ? AND store = ? AND is_active = 1
-                """, (datetime.now(), game_title, store))
-            else:
-                cursor.execute("""
-                    UPDATE watchlist
-                    SET last_checked = ?
-                    WHERE game_title = ? AND is_active = 1
-                """, (datetime.now(), game_title))
-            
-            conn.commit()
+            with self.transaction():
+                self.conn.executemany(UPDATE_WATCHLIST_CHECK_SQL, rows)
         except sqlite3.Error as e:
-            print(f"Error actualizando check de watchlist: {e}")
-        finally:
-            conn.close()
+            logger.error("Error actualizando check de watchlist: %s", e)
+    
+    @staticmethod
+    def _amazing_deal_row(deal: GameDeal, reason: str) -> tuple:
+        """Construye los parámetros de INSERT_AMAZING_DEAL_SQL para una oferta."""
+        return (
+            deal.title,
+            deal.store,
+            deal.price,
+            deal.original_price,
+            deal.discount_percent,
+            deal.url,
+            deal.deal_id,
+            reason,
+            to_epoch(deal.timestamp)
+        )
     
     def save_amazing_deal(self, deal: GameDeal, reason: str) -> bool:
         """Guarda una oferta imperdible."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            try:
+                self.conn.execute(INSERT_AMAZING_DEAL_SQL, self._amazing_deal_row(deal, reason))
+                
+                return True
+            except sqlite3.Error as e:
+                logger.error("Error guardando oferta imperdible: %s", e)
+                return False
+    
+    def save_amazing_deals_many(self, items: List[Tuple[GameDeal, str]]) -> List[int]:
+        """
+        Guarda varias ofertas imperdibles en una sola transacción.
+        
+        Retorna los IDs de las ofertas guardadas, en el mismo orden.
+        """
+        rows = [self._amazing_deal_row(deal, reason) for deal, reason in items]
+        if not rows:
+            return []
         
         try:
-            cursor.execute("""
-                INSERT INTO amazing_deals 
-                (game_title, store, price, original_price, discount_percent, 
-                 url, deal_id, reason, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                deal.title,
-                deal.store,
-                deal.price,
-                deal.original_price,
-                deal.discount_percent,
-                deal.url,
-                deal.deal_id,
-                reason,
-                deal.timestamp
-            ))
-            
-            conn.commit()
-            return True
+            with self.transaction():
+                # Una sentencia por fila para conocer cada ID; la transacción es la misma
+                return [self.conn.execute(INSERT_AMAZING_DEAL_SQL, row).lastrowid for row in rows]
         except sqlite3.Error as e:
-            print(f"Error guardando oferta imperdible: {e}")
-            return False
-        finally:
-            conn.close()
+            logger.error("Error guardando ofertas imperdibles: %s", e)
+            return []
     
     def get_amazing_deals(self, limit: int = 50, notified_only: bool = False) -> List[Dict[str, Any]]:
         """Obtiene ofertas imperdibles."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with self._reader() as conn:
+            try:
+                if notified_only:
+                    cursor = conn.execute("""
+                        SELECT * FROM amazing_deals
+                        WHERE notified = 1
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """, (limit,))
+                else:
+                    cursor = conn.execute("""
+                        SELECT * FROM amazing_deals
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """, (limit,))
+                
+                rows = cursor.fetchall()
+                return [dict(row) for row in rows]
+            except sqlite3.Error as e:
+                logger.error("Error obteniendo ofertas imperdibles: %s", e)
+                return []
+    
+    def get_amazing_deal_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene el resumen de todas las ofertas imperdibles guardadas.
         
-        try:
-            if notified_only:
-                cursor.execute("""
-                    SELECT * FROM amazing_deals
-                    WHERE notified = 1
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (limit,))
-            else:
-                cursor.execute("""
-                    SELECT * FROM amazing_deals
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (limit,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
-        except sqlite3.Error as e:
-            print(f"Error obteniendo ofertas imperdibles: {e}")
-            return []
-        finally:
-            conn.close()
+        Retorna `count`, `avg_discount` y `notified_count`, calculados en SQLite.
+        """
+        with self._reader() as conn:
+            try:
+                row = conn.execute("""
+                    SELECT COUNT(*) AS count,
+                           COALESCE(AVG(discount_percent), 0) AS avg_discount,
+                           COALESCE(SUM(notified = 1), 0) AS notified_count
+                    FROM amazing_deals
+                """).fetchone()
+                
+                return dict(row)
+            except sqlite3.Error as e:
+                logger.error("Error obteniendo estadísticas de ofertas: %s", e)
+                return {"count": 0, "avg_discount": 0.0, "notified_count": 0}
     
     def mark_deal_notified(self, deal_id: int):
         """Marca una oferta como notificada."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            try:
+                self.conn.execute(MARK_DEAL_NOTIFIED_SQL, (deal_id,))
+            except sqlite3.Error as e:
+                logger.error("Error marcando oferta como notificada: %s", e)
+    
+    def is_deal_notified(self, game_title: str, store: str, price: float) -> bool:
+        """Indica si ya se notificó esta oferta a un precio igual o menor."""
+        with self._reader() as conn:
+            try:
+                row = conn.execute("""
+                    SELECT 1 FROM amazing_deals
+                    WHERE notified = 1 AND game_title = ? AND store = ? AND price <= ?
+                    LIMIT 1
+                """, (game_title, store, price)).fetchone()
+                
+                return row is not None
+            except sqlite3.Error as e:
+                logger.error("Error consultando ofertas notificadas: %s", e)
+                return False
+    
+    def mark_deals_notified_many(self, deal_ids: List[int]):
+        """Marca varias ofertas como notificadas en una sola transacción."""
+        if not deal_ids:
+            return
         
         try:
-            cursor.execute("""
-                UPDATE amazing_deals
-                SET notified = 1
-                WHERE id = ?
-            """, (deal_id,))
-            
-            conn.commit()
+            with self.transaction():
+                self.conn.executemany(MARK_DEAL_NOTIFIED_SQL, [(deal_id,) for deal_id in deal_ids])
         except sqlite3.Error as e:
-            print(f"Error marcando oferta como notificada: {e}")
-        finally:
-            conn.close()
+            logger.error("Error marcando ofertas como notificadas: %s", e)
     
     def update_historical_low(self, game_id: str, game_title: str, store: str, 
-                             lowest_price: float) -> bool:
+                             lowest_price: float, now: Optional[datetime] = None) -> bool:
         """Actualiza el precio histórico más bajo de un juego."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO historical_lows
-                (game_id, game_title, store, lowest_price, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            """, (game_id, game_title, store, lowest_price, datetime.now()))
-            
-            conn.commit()
-            return True
-        except sqlite3.Error as e:
-            print(f"Error actualizando precio histórico: {e}")
-            return False
-        finally:
-            conn.close()
+        with self._lock:
+            try:
+                self.conn.execute("""
+                    INSERT INTO historical_lows
+                    (game_id, game_title, store, lowest_price, timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(game_id, store) DO UPDATE SET
+                        game_title = excluded.game_title,
+                        lowest_price = excluded.lowest_price,
+                        timestamp = excluded.timestamp
+                """, (game_id, game_title, store, lowest_price, to_epoch(now or datetime.now())))
+                
+                self._hl_cache.pop((game_id, store or None), None)
+                self._hl_cache.pop((game_id, None), None)
+                return True
+            except sqlite3.Error as e:
+                logger.error("Error actualizando precio histórico: %s", e)
+                return False
     
     def get_historical_low(self, game_id: str, store: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Obtiene el precio histórico más bajo de un juego."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        store = store or None
+        key = (game_id, store)
         
-        try:
-            if store:
-                cursor.execute("""
-                    SELECT * FROM historical_lows
-                    WHERE game_id = ? AND store = ?
-                """, (game_id, store))
-            else:
-                cursor.execute("""
+        with self._lock:
+            # Caché LRU en memoria; update_historical_low invalida las entradas afectadas
+            if key in self._hl_cache:
+                self._hl_cache.move_to_end(key)
+                cached = self._hl_cache[key]
+                return dict(cached) if cached else None
+            
+            try:
+                # Una sola sentencia para ambos casos, así la caché de sentencias siempre acierta
+                cursor = self.conn.execute("""
                     SELECT * FROM historical_lows
-                    WHERE game_id = ?
+                    WHERE game_id = ? AND (? IS NULL OR store = ?)
                     ORDER BY lowest_price ASC
                     LIMIT 1
-                """, (game_id,))
-            
-            row = cursor.fetchone()
-            return dict(row) if row else None
-        except sqlite3.Error as e:
-            print(f"Error obteniendo precio histórico: {e}")
-            return None
-        finally:
-            conn.close()
-
+                """, (game_id, store, store))
+                
+                row = cursor.fetchone()
+                result = dict(row) if row else None
+                
+                self._hl_cache[key] = result
+                if len(self._hl_cache) > HISTORICAL_LOW_CACHE_SIZE:
+                    self._hl_cache.popitem(last=False)
+                return dict(result) if result else None
+            except sqlite3.Error as e:
+                logger.error("Error obteniendo precio histórico: %s", e)
+                return None
+    
+    def get_cached(self, url: str, max_age_s: float) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el precio guardado para una URL si tiene menos de `max_age_s` segundos.
+        
+        Retorna las columnas de `ScrapedPrice` (con `timestamp` en segundos Unix).
+        """
+        with self._lock:
+            try:
+                row = self.conn.execute("""
+                    SELECT title, store, price, original_price, discount_percent, url, timestamp
+                    FROM scrape_cache
+                    WHERE url = ? AND fetched_at >= ?
+                """, (url, to_epoch(datetime.now()) - max_age_s)).fetchone()
+                
+                return dict(row) if row else None
+            except sqlite3.Error as e:
+                logger.error("Error leyendo caché de scraping: %s", e)
+                return None
+    
+    def put_cached(self, url: str, price: Dict[str, Any]) -> bool:
+        """Guarda (o reemplaza) el precio obtenido para una URL, columna a columna."""
+        with self._lock:
+            try:
+                self.conn.execute("""
+                    INSERT INTO scrape_cache
+                    (url, title, store, price, original_price, discount_percent,
+                     timestamp, fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        title = excluded.title,
+                        store = excluded.store,
+                        price = excluded.price,
+                        original_price = excluded.original_price,
+                        discount_percent = excluded.discount_percent,
+                        timestamp = excluded.timestamp,
+                        fetched_at = excluded.fetched_at
+                """, (
+                    url,
+                    price["title"],
+                    price["store"],
+                    price["price"],
+                    price["original_price"],
+                    price["discount_percent"],
+                    price["timestamp"],
+                    to_epoch(datetime.now())
+                ))
+                
+                return True
+            except sqlite3.Error as e:
+                logger.error("Error guardando caché de scraping: %s", e)
+                return False
+    
+    def evict_cached(self, max_age_s: float):
+        """Elimina las entradas de la caché de scraping más antiguas que `max_age_s` segundos."""
+        with self._lock:
+            try:
+                self.conn.execute(
+                    "DELETE FROM scrape_cache WHERE fetched_at < ?",
+                    (to_epoch(datetime.now()) - max_age_s,)
+                )
+            except sqlite3.Error as e:
+                logger.error("Error limpiando caché de scraping: %s", e)
+    
+    def get_scrape_pattern(self, domain: str, max_failures: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene los selectores aprendidos para un dominio.
+        
+        Retorna None si no hay patrón o si ya falló `max_failures` veces seguidas.
+        """
+        with self._lock:
+            try:
+                row = self.conn.execute("""
+                    SELECT title_selector, price_selector, original_price_selector, failures
+                    FROM scrape_patterns
+                    WHERE domain = ? AND failures < ?
+                """, (domain, max_failures)).fetchone()
+                
+                return dict(row) if row else None
+            except sqlite3.Error as e:
+                logger.error("Error leyendo patrón de scraping: %s", e)
+                return None
+    
+    def save_scrape_pattern(self, domain: str, title_selector: Optional[str],
+                            price_selector: str, original_price_selector: Optional[str]) -> bool:
+        """
+        Guarda los selectores con los que se obtuvo un precio en un dominio.
+        
+        No reinicia el contador de fallos: un dominio cuyo HTML inicial no trae el
+        precio deja de intentarse sin navegador aunque el scraping completo funcione.
+        """
+        with self._lock:
+            try:
+                self.conn.execute("""
+                    INSERT INTO scrape_patterns
+                    (domain, title_selector, price_selector, original_price_selector, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(domain) DO UPDATE SET
+                        title_selector = excluded.title_selector,
+                        price_selector = excluded.price_selector,
+                        original_price_selector = excluded.original_price_selector,
+                        updated_at = excluded.updated_at
+                """, (domain, title_selector, price_selector, original_price_selector,
+                      to_epoch(datetime.now())))
+                
+                return True
+            except sqlite3.Error as e:
+                logger.error("Error guardando patrón de scraping: %s", e)
+                return False
+    
+    def set_scrape_pattern_failures(self, domain: str, failures: int):
+        """Actualiza el número de fallos seguidos del patrón de un dominio."""
+        with self._lock:
+            try:
+                self.conn.execute(
+                    "UPDATE scrape_patterns SET failures = ? WHERE domain = ?",
+                    (failures, domain)
+                )
+            except sqlite3.Error as e:
+                logger.error("Error actualizando patrón de scraping: %s", e)
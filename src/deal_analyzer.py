@@ -1,6 +1,6 @@
 """Análisis de ofertas para identificar ofertas imperdibles."""
 
-from typing import Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
 from src.api_clients import GameDeal
 from src.config import MIN_DISCOUNT_FOR_DEAL, PRICE_TOLERANCE_PERCENT
 from src.database import Database
@@ -20,6 +20,12 @@ class DealAnalyzer:
         
         Retorna: (es_imperdible, razón)
         """
+        historical_low = self.db.get_historical_low(game_id or deal.deal_id, deal.store)
+        return self._evaluate(deal, historical_low)
+    
+    def _evaluate(self, deal: GameDeal,
+                  historical_low: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+        """Aplica los criterios de oferta imperdible con el mínimo histórico ya consultado."""
         reasons = []
         
         # Criterio 1: Descuento > 75%
@@ -27,8 +33,6 @@ class DealAnalyzer:
             reasons.append(f"Descuento del {deal.discount_percent:.1f}%")
         
         # Criterio 2: Precio dentro del 5% del mínimo histórico
-        historical_low = self.db.get_historical_low(game_id or deal.deal_id, deal.store)
-        
         if historical_low:
             lowest_price = historical_low.get("lowest_price", float('inf'))
             if lowest_price != float('inf') and lowest_price > 0:
@@ -58,7 +62,9 @@ class DealAnalyzer:
         
         Retorna un diccionario con información del análisis.
         """
-        is_amazing, reason = self.is_amazing_deal(deal, game_id)
+        # Se consulta el mínimo histórico una sola vez para ambos usos
+        historical_low = self.db.get_historical_low(game_id or deal.deal_id, deal.store)
+        is_amazing, reason = self._evaluate(deal, historical_low)
         
         result = {
             "deal": deal,
@@ -72,8 +78,7 @@ class DealAnalyzer:
         if target_price is not None:
             result["meets_target"] = self.check_target_price(deal, target_price)
         
-        # Obtener precio histórico
-        historical_low = self.db.get_historical_low(game_id or deal.deal_id, deal.store)
+        # Precio histórico
         if historical_low:
             result["historical_low"] = {
                 "price": historical_low.get("lowest_price"),
@@ -1,10 +1,20 @@
 """Punto de entrada principal de la aplicación."""
 
 import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
 import sys
 import os
 from pathlib import Path
 
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
 # Agregar el directorio raíz al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -13,6 +23,26 @@ from src.scheduler import run_scheduler
 from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
 
+def setup_logging(level: int = logging.INFO):
+    """
+    Configura el logging raíz para emitir desde un hilo en segundo plano.
+    
+    Los registros se encolan con un QueueHandler y un QueueListener los
+    escribe en stderr, de modo que el event loop nunca espera por la salida.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("[%(asctime)s] %(levelname)s %(name)s: %(message)s"))
+    
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
 def main():
     """Función principal."""
     import argparse
@@ -29,9 +59,21 @@ def main():
         type=str,
         help="API key de IsThereAnyDeal (opcional)"
     )
+    parser.add_argument(
+        "--initial-delay",
+        type=float,
+        default=0,
+        help="Segundos de espera antes de la primera verificación del scheduler (por defecto 0)"
+    )
     
     args = parser.parse_args()
     
+    setup_logging()
+    
+    # Event loop basado en libuv cuando está disponible (no existe en Windows)
+    if UVLOOP_AVAILABLE:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    
     if args.mode == "cli":
         cli = CLI()
         asyncio.run(cli.run())
@@ -39,7 +81,7 @@ def main():
         itad_key = args.itad_key or os.getenv("ITAD_API_KEY")
         print("Iniciando scheduler...")
         print("Presiona Ctrl+C para detener")
-        asyncio.run(run_scheduler(itad_key))
+        asyncio.run(run_scheduler(itad_key, args.initial_delay))
 
 
 if __name__ == "__main__":
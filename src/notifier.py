@@ -1,6 +1,7 @@
 """Sistema de notificaciones (Telegram y Desktop)."""
 
 import asyncio
+import logging
 from typing import Optional, List
 from datetime import datetime
 
@@ -10,11 +11,12 @@ try:
 except ImportError:
     PLYER_AVAILABLE = False
 
-import aiohttp
 TELEGRAM_AVAILABLE = True
 
 from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
-from src.api_clients import GameDeal
+from src.api_clients import GameDeal, SessionHolder
+
+logger = logging.getLogger(__name__)
 
 
 class Notifier:
@@ -25,6 +27,12 @@ class Notifier:
         self.telegram_chat_id = TELEGRAM_CHAT_ID
         self.telegram_enabled = bool(self.telegram_token and self.telegram_chat_id)
         self.desktop_enabled = PLYER_AVAILABLE
+        # Sesión persistente hacia api.telegram.org (reutiliza TLS y keep-alive)
+        self._session = SessionHolder(limit=4, limit_per_host=4, keepalive_timeout=60)
+    
+    async def close(self):
+        """Cierra la sesión HTTP de Telegram."""
+        await self._session.close()
     
     async def send_telegram_message(self, message: str) -> bool:
         """Envía un mensaje a través de Telegram."""
@@ -34,17 +42,17 @@ class Notifier:
         url = f"https://api.telegram.org/bot{self.telegram_token}/sendMessage"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "chat_id": self.telegram_chat_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                }
-                
-                async with session.post(url, json=payload) as response:
-                    return response.status == 200
+            session = self._session.get()
+            payload = {
+                "chat_id": self.telegram_chat_id,
+                "text": message,
+                "parse_mode": "HTML"
+            }
+            
+            async with session.post(url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
-            print(f"Error enviando mensaje de Telegram: {e}")
+            logger.error("Error enviando mensaje de Telegram: %s", e)
             return False
     
     def send_desktop_notification(self, title: str, message: str) -> bool:
@@ -60,27 +68,27 @@ class Notifier:
             )
             return True
         except Exception as e:
-            print(f"Error enviando notificación de escritorio: {e}")
+            logger.error("Error enviando notificación de escritorio: %s", e)
             return False
     
     def format_deal_message(self, deal: GameDeal, reason: Optional[str] = None) -> str:
         """Formatea un mensaje de oferta."""
-        message = f"🎮 <b>{deal.title}</b>\n"
-        message += f"🏪 Tienda: {deal.store}\n"
-        message += f"💰 Precio: ${deal.price:.2f}"
-        
         if deal.original_price > deal.price:
-            message += f" (antes ${deal.original_price:.2f})\n"
-            message += f"🎯 Descuento: {deal.discount_percent:.1f}%\n"
+            price_details = (
+                f" (antes ${deal.original_price:.2f})\n"
+                f"🎯 Descuento: {deal.discount_percent:.1f}%\n"
+            )
         else:
-            message += "\n"
-        
-        if reason:
-            message += f"✨ {reason}\n"
-        
-        message += f"🔗 {deal.url}"
-        
-        return message
+            price_details = "\n"
+        reason_line = f"✨ {reason}\n" if reason else ""
+        
+        return (
+            f"🎮 <b>{deal.title}</b>\n"
+            f"🏪 Tienda: {deal.store}\n"
+            f"💰 Precio: ${deal.price:.2f}{price_details}"
+            f"{reason_line}"
+            f"🔗 {deal.url}"
+        )
     
     async def notify_amazing_deal(self, deal: GameDeal, reason: Optional[str] = None):
         """Notifica una oferta imperdible."""
@@ -94,8 +102,12 @@ class Notifier:
             tasks.append(self.send_telegram_message(message))
         
         if self.desktop_enabled:
-            # Desktop notification es síncrona, la ejecutamos directamente
-            self.send_desktop_notification(title, f"{deal.title} - ${deal.price:.2f} ({deal.discount_percent:.1f}% off)")
+            # Desktop notification es síncrona, se ejecuta en un hilo para no bloquear el loop
+            tasks.append(asyncio.to_thread(
+                self.send_desktop_notification,
+                title,
+                f"{deal.title} - ${deal.price:.2f} ({deal.discount_percent:.1f}% off)"
+            ))
         
         if tasks:
             await asyncio.gather(*tasks)
@@ -111,10 +123,11 @@ class Notifier:
             tasks.append(self.send_telegram_message(message))
         
         if self.desktop_enabled:
-            self.send_desktop_notification(
+            tasks.append(asyncio.to_thread(
+                self.send_desktop_notification,
                 title,
                 f"{deal.title} - ${deal.price:.2f} (objetivo: ${target_price:.2f})"
-            )
+            ))
         
         if tasks:
             await asyncio.gather(*tasks)
@@ -124,15 +137,18 @@ class Notifier:
         if not deals:
             return
         
-        message = f"<b>{title}</b>\n\n"
-        
-        for i, deal in enumerate(deals[:10], 1):  # Limitar a 10 ofertas
-            message += f"{i}. <b>{deal.title}</b> - {deal.store}\n"
-            message += f"   ${deal.price:.2f} ({deal.discount_percent:.1f}% off)\n"
-            message += f"   {deal.url}\n\n"
+        lines = [f"<b>{title}</b>\n\n"]
+        lines.extend(
+            f"{i}. <b>{deal.title}</b> - {deal.store}\n"
+            f"   ${deal.price:.2f} ({deal.discount_percent:.1f}% off)\n"
+            f"   {deal.url}\n\n"
+            for i, deal in enumerate(deals[:10], 1)  # Limitar a 10 ofertas
+        )
         
         if len(deals) > 10:
-            message += f"... y {len(deals) - 10} ofertas más"
+            lines.append(f"... y {len(deals) - 10} ofertas más")
+        
+        message = "".join(lines)
         
         tasks = []
         
@@ -140,10 +156,11 @@ class Notifier:
             tasks.append(self.send_telegram_message(message))
         
         if self.desktop_enabled:
-            self.send_desktop_notification(
+            tasks.append(asyncio.to_thread(
+                self.send_desktop_notification,
                 title,
                 f"Se encontraron {len(deals)} ofertas"
-            )
+            ))
         
         if tasks:
             await asyncio.gather(*tasks)
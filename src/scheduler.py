@@ -1,6 +1,7 @@
 """Scheduler para ejecución automática de verificaciones."""
 
 import asyncio
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -10,82 +11,126 @@ from src.api_clients import APIManager
 from src.notifier import Notifier
 from src.config import CHECK_INTERVAL_HOURS
 
+logger = logging.getLogger(__name__)
+
 
 class Scheduler:
     """Scheduler para verificación automática de watchlist."""
     
-    def __init__(self, itad_api_key: Optional[str] = None):
+    def __init__(self, itad_api_key: Optional[str] = None, initial_delay: float = 0):
         self.db = Database()
         self.api_manager = APIManager(itad_api_key)
         self.watchlist_manager = WatchlistManager(self.db, self.api_manager)
         self.notifier = Notifier()
         self.running = False
         self.interval_hours = CHECK_INTERVAL_HOURS
+        self.initial_delay = initial_delay
+        self._stop_event = asyncio.Event()
     
     async def check_and_notify(self):
         """Verifica la watchlist y envía notificaciones."""
-        print(f"[{datetime.now()}] Verificando watchlist...")
+        tick_now = datetime.now()
+        logger.info("Verificando watchlist...")
         
-        results = await self.watchlist_manager.check_all_games()
+        results = await self.watchlist_manager.check_all_games(tick_now)
         
         amazing_deals = []
         target_deals = []
+        notify_tasks = []
+        # ID en amazing_deals de cada notificación (None para precios objetivo)
+        notify_ids = []
+        already_notified = []
         
         for result in results:
             deal = result["deal"]
             analysis = result["analysis"]
             
-            # Ofertas imperdibles
+            # Ofertas imperdibles; no se repiten las ya notificadas a igual o menor precio
             if result["is_amazing_deal"]:
                 amazing_deals.append((deal, analysis["reason"]))
-                await self.notifier.notify_amazing_deal(deal, analysis["reason"])
+                if self.db.is_deal_notified(deal.title, deal.store, deal.price):
+                    already_notified.append(result["amazing_deal_id"])
+                    continue
+                notify_tasks.append(self.notifier.notify_amazing_deal(deal, analysis["reason"]))
+                notify_ids.append(result["amazing_deal_id"])
             
             # Precios objetivo alcanzados
             elif result["meets_target"]:
                 target_price = result["watchlist_item"].get("target_price")
                 if target_price:
                     target_deals.append(deal)
-                    await self.notifier.notify_target_price(deal, target_price)
+                    notify_tasks.append(self.notifier.notify_target_price(deal, target_price))
+                    notify_ids.append(None)
+        
+        # Enviar todas las notificaciones en paralelo
+        notified = [deal_id for deal_id in already_notified if deal_id is not None]
+        outcomes = await asyncio.gather(*notify_tasks, return_exceptions=True)
+        for deal_id, error in zip(notify_ids, outcomes):
+            if isinstance(error, Exception):
+                logger.error("Error enviando notificación: %s", error)
+            elif deal_id is not None:
+                notified.append(deal_id)
+        
+        self.db.mark_deals_notified_many(notified)
         
         if amazing_deals or target_deals:
-            print(f"[{datetime.now()}] Se encontraron {len(amazing_deals)} ofertas imperdibles y {len(target_deals)} precios objetivo")
+            logger.info("Se encontraron %d ofertas imperdibles y %d precios objetivo",
+                        len(amazing_deals), len(target_deals))
         else:
-            print(f"[{datetime.now()}] No se encontraron ofertas destacadas")
+            logger.info("No se encontraron ofertas destacadas")
     
     async def run_forever(self):
         """Ejecuta el scheduler indefinidamente."""
         self.running = True
-        print(f"Scheduler iniciado. Verificando cada {self.interval_hours} horas.")
-        print(f"Primera verificación en 1 minuto...")
+        logger.info("Scheduler iniciado. Verificando cada %s horas.", self.interval_hours)
         
-        # Esperar 1 minuto antes de la primera verificación
-        await asyncio.sleep(60)
+        # El esquema se prepara en un hilo mientras transcurre la espera inicial
+        schema_ready = asyncio.create_task(self.db.ensure_schema())
+        
+        # Espera opcional antes de la primera verificación
+        if self.initial_delay > 0:
+            logger.info("Primera verificación en %g segundos...", self.initial_delay)
+            await self._wait(self.initial_delay)
+        
+        await schema_ready
         
         while self.running:
             try:
                 await self.check_and_notify()
             except Exception as e:
-                print(f"[{datetime.now()}] Error en verificación: {e}")
+                logger.error("Error en verificación: %s", e)
             
             # Esperar hasta la próxima verificación
             next_check = datetime.now() + timedelta(hours=self.interval_hours)
-            print(f"Próxima verificación: {next_check}")
+            logger.info("Próxima verificación: %s", next_check)
             
-            await asyncio.sleep(self.interval_hours * 3600)
+            await self._wait(self.interval_hours * 3600)
+    
+    async def _wait(self, seconds: float):
+        """Espera `seconds` segundos o hasta que se llame a stop()."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
     
     def stop(self):
         """Detiene el scheduler."""
         self.running = False
-        print("Scheduler detenido.")
+        self._stop_event.set()
+        logger.info("Scheduler detenido.")
 
 
-async def run_scheduler(itad_api_key: Optional[str] = None):
+async def run_scheduler(itad_api_key: Optional[str] = None, initial_delay: float = 0):
     """Función helper para ejecutar el scheduler."""
-    scheduler = Scheduler(itad_api_key)
+    scheduler = Scheduler(itad_api_key, initial_delay)
     
     try:
         await scheduler.run_forever()
     except KeyboardInterrupt:
         scheduler.stop()
-        print("Scheduler interrumpido por el usuario.")
+        logger.info("Scheduler interrumpido por el usuario.")
+    finally:
+        await scheduler.api_manager.close()
+        await scheduler.notifier.close()
+        await scheduler.watchlist_manager.close()
 
@@ -1,12 +1,88 @@
 """Web scraper usando Playwright para tiendas sin API."""
 
-from typing import List, Optional, Dict, Any
-from playwright.async_api import async_playwright, Browser, Page
-from dataclasses import dataclass
+import logging
+import re
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Dict, Any
+from urllib.parse import urlsplit
+import aiohttp
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+from dataclasses import asdict, dataclass
 from datetime import datetime
 
-from src.config import PLAYWRIGHT_HEADLESS, PLAYWRIGHT_TIMEOUT
-from src.api_clients import GameDeal
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+from src.config import PLAYWRIGHT_TIMEOUT, SCRAPE_CACHE_TTL_SECONDS
+from src.api_clients import GameDeal, SessionHolder, check_response, json_loads
+from src.database import Database, to_epoch
+from src.browser_pool import BrowserPool, browser_pool
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima (ms) a que aparezca algún precio en el scraping genérico
+GENERIC_SELECTOR_TIMEOUT = 2000
+
+# Selectores de título, precio y precio original de cada tienda conocida
+STEAM_SELECTORS = {
+    "title": "h1.apphub_AppName",
+    "price": ".game_purchase_price, .discount_final_price",
+    "original_price": ".discount_original_price",
+}
+EPIC_SELECTORS = {
+    "title": "h1",
+    "price": "[data-testid='purchase-price']",
+    "original_price": "[data-testid='original-price']",
+}
+GENERIC_TITLE_SELECTOR = "h1, .title, [class*='title']"
+
+# Selectores de precio del scraping genérico, en orden de preferencia
+GENERIC_PRICE_SELECTORS = (
+    "[data-price]",
+    ".price",
+    ".product-price",
+    "[class*='price']",
+    "[id*='price']",
+)
+
+# API JSON de la tienda de Steam y el appid dentro de la URL de un juego
+STEAM_APPDETAILS_URL = "https://store.steampowered.com/api/appdetails"
+_STEAM_APP_RE = re.compile(r"store\.steampowered\.com/app/(\d+)")
+
+# Fallos seguidos tras los que un dominio deja de leerse sin navegador
+STATIC_PATTERN_MAX_FAILURES = 3
+
+# Primer precio del texto ("19.99", "1,234.56", "1.234,56", "1 299,99"): grupos
+# de miles de 3 dígitos separados por ".", "," o un espacio, y hasta 2 decimales.
+# Así "$59.99 $19.99" da solo el primer precio en vez de unir ambos números.
+_PRICE_RE = re.compile(r"(?<!\d)(?:\d{1,3}(?:[ \xa0.,]\d{3})+|\d+)(?:[.,]\d{1,2})?(?!\d)")
+
+# Espacios que pueden separar grupos de miles dentro de un precio
+_PRICE_SPACES = str.maketrans("", "", " \xa0")
+
+# Lee el texto del primer elemento de cada selector en un solo viaje al navegador
+_EXTRACT_TEXT_JS = """
+(selectors) => Object.fromEntries(Object.entries(selectors).map(([key, selector]) => {
+    const element = document.querySelector(selector);
+    return [key, element ? element.textContent : null];
+}))
+"""
+
+# Sesión HTTP para descargar el HTML sin navegador
+static_session = SessionHolder(limit=8, limit_per_host=4)
+
+
+def _select_texts(html: str, selectors: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """Lee el texto del primer elemento de cada selector en un HTML ya descargado."""
+    tree = LexborHTMLParser(html)
+    texts = {}
+    for key, selector in selectors.items():
+        node = tree.css_first(selector) if selector else None
+        texts[key] = node.text() if node else None
+    return texts
 
 
 @dataclass
@@ -19,217 +95,329 @@ class ScrapedPrice:
     discount_percent: float
     url: str
     timestamp: datetime
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el precio a las columnas de la caché de scraping."""
+        data = asdict(self)
+        data["timestamp"] = to_epoch(self.timestamp)
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScrapedPrice":
+        """Reconstruye un precio a partir de `to_dict`."""
+        return cls(**{**data, "timestamp": datetime.fromtimestamp(data["timestamp"])})
 
 
 class GameStoreScraper:
-    """Scraper genérico para tiendas de juegos."""
+    """
+    Scraper genérico para tiendas de juegos.
     
-    def __init__(self):
-        self.browser: Optional[Browser] = None
-        self.headless = PLAYWRIGHT_HEADLESS
+    Los navegadores provienen de un `BrowserPool` que los mantiene abiertos
+    entre usos; cada URL se scrapea en su propio contexto, así que varias
+    llamadas concurrentes no comparten cookies ni conexiones. Si se pasa una
+    `Database`, los precios se guardan en su caché de scraping durante
+    `cache_ttl` segundos, y los selectores que funcionan en cada dominio se
+    recuerdan para leer después el HTML con una petición HTTP, sin navegador.
+    """
+    
+    def __init__(self, pool: Optional[BrowserPool] = None, db: Optional[Database] = None,
+                 cache_ttl: float = SCRAPE_CACHE_TTL_SECONDS,
+                 get_session: Optional[Callable[[], aiohttp.ClientSession]] = None):
+        self.pool = pool or browser_pool
+        self.db = db
+        self.cache_ttl = cache_ttl
         self.timeout = PLAYWRIGHT_TIMEOUT
+        self._get_session = get_session or static_session.get
     
     async def __aenter__(self):
         """Context manager entry."""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(headless=self.headless)
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit."""
-        if self.browser:
-            await self.browser.close()
     
-    async def scrape_steam_price(self, game_url: str) -> Optional[ScrapedPrice]:
-        """Scrapea el precio de un juego en Steam."""
-        if not self.browser:
-            return None
+    @asynccontextmanager
+    async def _open_page(self) -> AsyncIterator[Page]:
+        """
+        Entrega la página de un contexto del pool y lo libera al terminar.
         
-        page = await self.browser.new_page()
+        Un contexto reutilizado ya trae su página abierta; solo se crea una
+        si el contexto es nuevo.
+        """
+        async with self.pool.context() as context:
+            yield context.pages[0] if context.pages else await context.new_page()
+    
+    async def _read_texts(self, page: Page,
+                          selectors: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        """
+        Lee el texto del primer elemento de cada selector de la página.
         
+        Con selectolax se pide el HTML una sola vez y se consulta localmente;
+        si no, todos los selectores se resuelven en un único `evaluate`.
+        """
+        if SELECTOLAX_AVAILABLE:
+            return _select_texts(await page.content(), selectors)
+        return await page.evaluate(_EXTRACT_TEXT_JS, selectors)
+    
+    async def scrape_steam_price(self, game_url: str) -> Optional[ScrapedPrice]:
+        """Scrapea el precio de un juego en Steam."""
         try:
-            await page.goto(game_url, wait_until="networkidle", timeout=self.timeout)
-            
-            # Selectores comunes de Steam
-            title_selector = "h1.apphub_AppName"
-            price_selector = ".game_purchase_price, .discount_final_price"
-            original_price_selector = ".discount_original_price"
-            
-            title = await page.text_content(title_selector) or "Unknown"
-            
-            # Intentar obtener precio con descuento
-            discount_price_elem = await page.query_selector(price_selector)
-            original_price_elem = await page.query_selector(original_price_selector)
-            
-            if discount_price_elem:
-                price_text = await discount_price_elem.text_content() or "0"
-                price = self._parse_price(price_text)
-                
-                if original_price_elem:
-                    original_price_text = await original_price_elem.text_content() or "0"
-                    original_price = self._parse_price(original_price_text)
-                else:
-                    original_price = price
+            async with self._open_page() as page:
+                # Basta con que exista el precio; no hace falta esperar a que la red quede inactiva
+                await page.goto(game_url, wait_until="domcontentloaded", timeout=self.timeout)
+                await page.wait_for_selector(STEAM_SELECTORS["price"], state="attached",
+                                             timeout=self.timeout)
                 
-                discount = ((original_price - price) / original_price * 100) if original_price > 0 else 0
-            else:
-                # Sin descuento
-                price_elem = await page.query_selector(".game_purchase_price")
-                if price_elem:
-                    price_text = await price_elem.text_content() or "0"
-                    price = self._parse_price(price_text)
-                    original_price = price
-                    discount = 0
-                else:
-                    return None
-            
-            return ScrapedPrice(
-                title=title.strip(),
-                store="Steam",
-                price=price,
-                original_price=original_price,
-                discount_percent=discount,
-                url=game_url,
-                timestamp=datetime.now()
-            )
+                texts = await self._read_texts(page, STEAM_SELECTORS)
+                scraped = self._build_price(texts, "Steam", game_url)
+                if scraped:
+                    self._learn_pattern(game_url, STEAM_SELECTORS)
+                return scraped
         
         except Exception as e:
-            print(f"Error scraping Steam: {e}")
+            logger.error("Error scraping Steam: %s", e)
             return None
-        finally:
-            await page.close()
     
     async def scrape_epic_price(self, game_url: str) -> Optional[ScrapedPrice]:
         """Scrapea el precio de un juego en Epic Games Store."""
-        if not self.browser:
+        try:
+            async with self._open_page() as page:
+                await page.goto(game_url, wait_until="domcontentloaded", timeout=self.timeout)
+                await page.wait_for_selector(EPIC_SELECTORS["price"], state="attached",
+                                             timeout=self.timeout)
+                
+                texts = await self._read_texts(page, EPIC_SELECTORS)
+                scraped = self._build_price(texts, "Epic Games", game_url)
+                if scraped:
+                    self._learn_pattern(game_url, EPIC_SELECTORS)
+                return scraped
+        
+        except Exception as e:
+            logger.error("Error scraping Epic: %s", e)
             return None
+    
+    async def fetch_steam_api_price(self, game_url: str) -> Optional[ScrapedPrice]:
+        """
+        Obtiene el precio de un juego de Steam desde la API `appdetails`, sin navegador.
         
-        page = await self.browser.new_page()
+        Retorna None si la URL no es de una app de Steam o la respuesta no trae
+        el precio final en `price_overview` (por ejemplo, juegos gratuitos o no
+        disponibles).
+        """
+        match = _STEAM_APP_RE.search(game_url)
+        if not match:
+            return None
         
+        appid = match.group(1)
+        params = {"appids": appid, "cc": "us", "l": "en"}
         try:
-            await page.goto(game_url, wait_until="networkidle", timeout=self.timeout)
-            
-            # Selectores de Epic Games Store
-            title_selector = "h1"
-            price_selector = "[data-testid='purchase-price']"
-            original_price_selector = "[data-testid='original-price']"
-            
-            title_elem = await page.query_selector(title_selector)
-            title = await title_elem.text_content() if title_elem else "Unknown"
-            
-            price_elem = await page.query_selector(price_selector)
-            original_price_elem = await page.query_selector(original_price_selector)
-            
-            if price_elem:
-                price_text = await price_elem.text_content() or "0"
-                price = self._parse_price(price_text)
-                
-                if original_price_elem:
-                    original_price_text = await original_price_elem.text_content() or "0"
-                    original_price = self._parse_price(original_price_text)
-                else:
-                    original_price = price
-                
-                discount = ((original_price - price) / original_price * 100) if original_price > 0 else 0
-                
-                return ScrapedPrice(
-                    title=title.strip(),
-                    store="Epic Games",
-                    price=price,
-                    original_price=original_price,
-                    discount_percent=discount,
-                    url=game_url,
-                    timestamp=datetime.now()
-                )
-            
+            session = self._get_session()
+            async with session.get(STEAM_APPDETAILS_URL, params=params) as response:
+                await check_response(response)
+                data = await response.json(loads=json_loads)
+        except Exception as e:
+            logger.warning("Error en API de Steam: %s", e)
             return None
         
-        except Exception as e:
-            print(f"Error scraping Epic: {e}")
+        app = (data or {}).get(appid) or {}
+        details = app.get("data") or {}
+        overview = details.get("price_overview") or {}
+        final = overview.get("final")
+        if not app.get("success") or final is None:
+            return None
+        
+        # La API expresa los precios en centavos
+        return ScrapedPrice(
+            title=details.get("name") or "Unknown",
+            store="Steam",
+            price=final / 100,
+            original_price=overview.get("initial", final) / 100,
+            discount_percent=float(overview.get("discount_percent", 0)),
+            url=game_url,
+            timestamp=datetime.now()
+        )
+    
+    def _build_price(self, texts: Dict[str, Optional[str]], store: str,
+                     game_url: str) -> Optional[ScrapedPrice]:
+        """Construye el precio a partir de los textos leídos de la página."""
+        if not texts["price"]:
             return None
-        finally:
-            await page.close()
+        
+        price = self._parse_price(texts["price"])
+        
+        # Sin elemento de precio original no hay descuento
+        if texts.get("original_price"):
+            original_price = self._parse_price(texts["original_price"])
+        else:
+            original_price = price
+        
+        discount = ((original_price - price) / original_price * 100) if original_price > 0 else 0
+        
+        return ScrapedPrice(
+            title=(texts.get("title") or "Unknown").strip(),
+            store=store,
+            price=price,
+            original_price=original_price,
+            discount_percent=discount,
+            url=game_url,
+            timestamp=datetime.now()
+        )
     
     def _parse_price(self, price_text: str) -> float:
-        """Parsea texto de precio a float."""
-        import re
+        """
+        Parsea texto de precio a float.
         
-        # Remover símbolos y espacios
-        price_text = price_text.replace("$", "").replace("€", "").replace("£", "").strip()
+        El último separador es el decimal solo si lo siguen 1 o 2 dígitos; los
+        demás son separadores de miles. Así "1,234.56" y "1.234,56" dan 1234.56,
+        y "$1,234" o "1.234" dan 1234. Si el texto trae varios precios (el
+        anterior y el rebajado), se toma el primero.
+        """
+        match = _PRICE_RE.search(price_text)
+        if not match:
+            return 0.0
         
-        # Buscar número con decimales
-        match = re.search(r'(\d+[.,]\d+|\d+)', price_text)
-        if match:
-            price_str = match.group(1).replace(",", ".")
-            try:
-                return float(price_str)
-            except ValueError:
-                return 0.0
+        number = match.group().translate(_PRICE_SPACES)
+        decimal_pos = max(number.rfind("."), number.rfind(","))
+        if decimal_pos == -1 or len(number) - decimal_pos - 1 > 2:
+            return float(number.replace(".", "").replace(",", ""))
         
-        return 0.0
+        integer_part = number[:decimal_pos].replace(".", "").replace(",", "")
+        return float(f"{integer_part}.{number[decimal_pos + 1:]}")
     
-    async def verify_price(self, game_url: str, store: str) -> Optional[ScrapedPrice]:
-        """Verifica el precio actual de un juego en una tienda específica."""
-        store_lower = store.lower()
+    async def verify_price(self, game_url: str, store: str,
+                           force_refresh: bool = False) -> Optional[ScrapedPrice]:
+        """
+        Verifica el precio actual de un juego en una tienda específica.
+        
+        Usa la caché de scraping si hay un resultado reciente, salvo con `force_refresh`.
+        """
+        if self.db and not force_refresh:
+            cached = self.db.get_cached(game_url, self.cache_ttl)
+            if cached:
+                return ScrapedPrice.from_dict(cached)
         
+        # Primero la API de Steam o el HTML sin navegador; Playwright solo si eso no basta
+        scraped = await self.fetch_steam_api_price(game_url)
+        if scraped is None:
+            scraped = await self._scrape_static(game_url, store)
+        
+        if scraped is None:
+            store_lower = store.lower()
+            
+            if "steam" in store_lower:
+                scraped = await self.scrape_steam_price(game_url)
+            elif "epic" in store_lower:
+                scraped = await self.scrape_epic_price(game_url)
+            else:
+                # Intentar scraping genérico
+                scraped = await self._generic_scrape(game_url, store)
+        
+        if scraped and self.db:
+            self.db.put_cached(game_url, scraped.to_dict())
+        
+        return scraped
+    
+    def _store_name(self, store: str) -> str:
+        """Nombre de tienda con el que el scraping de Playwright guarda sus precios."""
+        store_lower = store.lower()
         if "steam" in store_lower:
-            return await self.scrape_steam_price(game_url)
-        elif "epic" in store_lower:
-            return await self.scrape_epic_price(game_url)
-        else:
-            # Intentar scraping genérico
-            return await self._generic_scrape(game_url, store)
+            return "Steam"
+        if "epic" in store_lower:
+            return "Epic Games"
+        return store
     
-    async def _generic_scrape(self, game_url: str, store: str) -> Optional[ScrapedPrice]:
-        """Scraping genérico para tiendas desconocidas."""
-        if not self.browser:
+    def _learn_pattern(self, game_url: str, selectors: Dict[str, Optional[str]]):
+        """Recuerda los selectores con los que se leyó el precio de un dominio."""
+        if self.db and SELECTOLAX_AVAILABLE:
+            self.db.save_scrape_pattern(
+                urlsplit(game_url).hostname or "",
+                selectors["title"],
+                selectors["price"],
+                selectors["original_price"]
+            )
+    
+    async def _scrape_static(self, game_url: str, store: str) -> Optional[ScrapedPrice]:
+        """
+        Lee el precio del HTML inicial con una petición HTTP, sin abrir el navegador.
+        
+        Solo se intenta en dominios con selectores aprendidos; si el precio no
+        aparece se cuenta un fallo del patrón y el llamador recurre a Playwright.
+        """
+        if not (self.db and SELECTOLAX_AVAILABLE):
             return None
         
-        page = await self.browser.new_page()
+        domain = urlsplit(game_url).hostname or ""
+        pattern = self.db.get_scrape_pattern(domain, STATIC_PATTERN_MAX_FAILURES)
+        if not pattern:
+            return None
         
         try:
-            await page.goto(game_url, wait_until="networkidle", timeout=self.timeout)
-            
-            # Intentar encontrar precio usando selectores comunes
-            price_selectors = [
-                "[data-price]",
-                ".price",
-                ".product-price",
-                "[class*='price']",
-                "[id*='price']"
-            ]
-            
-            price = 0.0
-            original_price = 0.0
-            
-            for selector in price_selectors:
-                elements = await page.query_selector_all(selector)
-                if elements:
-                    price_text = await elements[0].text_content()
-                    if price_text:
-                        price = self._parse_price(price_text)
-                        original_price = price
-                        break
-            
-            if price > 0:
-                title_elem = await page.query_selector("h1, .title, [class*='title']")
-                title = await title_elem.text_content() if title_elem else "Unknown"
-                
-                return ScrapedPrice(
-                    title=title.strip(),
-                    store=store,
-                    price=price,
-                    original_price=original_price,
-                    discount_percent=0.0,
-                    url=game_url,
-                    timestamp=datetime.now()
-                )
-            
+            session = self._get_session()
+            async with session.get(game_url) as response:
+                html = await response.text() if response.ok else ""
+        except Exception as e:
+            # Un error de red no invalida el patrón
+            logger.warning("Error descargando HTML de %s: %s", domain, e)
             return None
         
+        texts = _select_texts(html, {
+            "title": pattern["title_selector"],
+            "price": pattern["price_selector"],
+            "original_price": pattern["original_price_selector"]
+        })
+        scraped = self._build_price(texts, self._store_name(store), game_url)
+        
+        if scraped and scraped.price > 0:
+            if pattern["failures"]:
+                self.db.set_scrape_pattern_failures(domain, 0)
+            return scraped
+        
+        self.db.set_scrape_pattern_failures(domain, pattern["failures"] + 1)
+        return None
+    
+    async def _generic_scrape(self, game_url: str, store: str) -> Optional[ScrapedPrice]:
+        """Scraping genérico para tiendas desconocidas."""
+        try:
+            async with self._open_page() as page:
+                await page.goto(game_url, wait_until="domcontentloaded", timeout=self.timeout)
+                
+                # Esperar a cualquiera de los selectores comunes y leerlos todos de una vez
+                try:
+                    await page.wait_for_selector(", ".join(GENERIC_PRICE_SELECTORS),
+                                                 state="attached",
+                                                 timeout=GENERIC_SELECTOR_TIMEOUT)
+                except PlaywrightTimeoutError:
+                    return None
+                
+                texts = await self._read_texts(page, {
+                    "title": GENERIC_TITLE_SELECTOR,
+                    **{selector: selector for selector in GENERIC_PRICE_SELECTORS}
+                })
+                
+                selector = next((candidate for candidate in GENERIC_PRICE_SELECTORS
+                                 if texts[candidate]), None)
+                price = self._parse_price(texts[selector]) if selector else 0.0
+                
+                if price > 0:
+                    self._learn_pattern(game_url, {
+                        "title": GENERIC_TITLE_SELECTOR,
+                        "price": selector,
+                        "original_price": None
+                    })
+                    
+                    return ScrapedPrice(
+                        title=(texts["title"] or "Unknown").strip(),
+                        store=store,
+                        price=price,
+                        original_price=price,
+                        discount_percent=0.0,
+                        url=game_url,
+                        timestamp=datetime.now()
+                    )
+                
+                return None
+        
         except Exception as e:
-            print(f"Error en scraping genérico: {e}")
+            logger.error("Error en scraping genérico: %s", e)
             return None
-        finally:
-            await page.close()
 
@@ -1,16 +1,21 @@
 """Aplicación web Streamlit para Game Deal Hunter."""
 
+import asyncio
+import json
+import threading
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from src.database import Database
 from src.watchlist import WatchlistManager
 from src.api_clients import APIManager
 from src.deal_analyzer import DealAnalyzer
 
+# Con más puntos que estos, los gráficos del historial usan promedios diarios
+HISTORY_PLOT_MAX_POINTS = 1000
 
 # Configuración de la página
 st.set_page_config(
@@ -36,6 +41,36 @@ def init_components():
 db, watchlist_manager, analyzer = init_components()
 
 
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Event loop persistente, ejecutándose en un hilo propio.
+    
+    Se comparte entre reruns y sesiones, así la sesión HTTP de `APIManager` y
+    sus conexiones siguen vivas entre búsquedas en lugar de crearse y cerrarse
+    con cada `asyncio.run`.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="streamlit-event-loop", daemon=True).start()
+    return loop
+
+
+def run_async(coro):
+    """Ejecuta una corrutina en el event loop persistente y espera su resultado."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+def close_components():
+    """
+    Cierra la sesión HTTP y las conexiones SQLite de los componentes actuales.
+    
+    Se llama antes de descartarlos con `init_components.clear()`; el event
+    loop persistente no se recrea.
+    """
+    run_async(watchlist_manager.api_manager.close())
+    db.close()
+
+
 def main():
     """Función principal de la aplicación."""
     st.title("🎮 Game Deal Hunter")
@@ -53,7 +88,9 @@ def main():
         
         # Opción para refrescar datos
         if st.button("🔄 Refrescar Datos", use_container_width=True):
-            st.cache_resource.clear()
+            close_components()
+            init_components.clear()
+            st.cache_data.clear()
             st.rerun()
         
         st.markdown("---")
@@ -105,14 +142,16 @@ def render_watchlist_page():
     if watchlist:
         df = pd.DataFrame(watchlist)
         
-        # Formatear columnas
+        # Formatear columnas sobre la columna completa; los precios conservan su tipo
+        # numérico y se formatean al mostrarse (column_config)
         display_df = df.copy()
-        display_df['target_price'] = display_df['target_price'].apply(
-            lambda x: f"${x:.2f}" if x else "N/A"
-        )
+        target_price = pd.to_numeric(display_df['target_price'])
+        display_df['target_price'] = target_price.where(target_price > 0)
         display_df['created_at'] = pd.to_datetime(display_df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
-        display_df['last_checked'] = display_df['last_checked'].apply(
-            lambda x: pd.to_datetime(x).strftime('%Y-%m-%d %H:%M') if x else "Nunca"
+        display_df['last_checked'] = (
+            pd.to_datetime(display_df['last_checked'], errors='coerce')
+            .dt.strftime('%Y-%m-%d %H:%M')
+            .fillna("Nunca")
         )
         
         # Renombrar columnas
@@ -129,7 +168,10 @@ def render_watchlist_page():
         st.dataframe(
             display_df[['Juego', 'Precio Objetivo', 'Tienda', 'Agregado', 'Última Verificación']],
             use_container_width=True,
-            hide_index=True
+            hide_index=True,
+            column_config={
+                'Precio Objetivo': st.column_config.NumberColumn(format="$%.2f")
+            }
         )
         
         # Opción para eliminar de watchlist
@@ -150,6 +192,131 @@ def render_watchlist_page():
                     st.error(f"✗ Error al eliminar '{selected_game}'")
 
 
+@st.cache_data(ttl=300, show_spinner=False)
+def build_history_view(_db: Database, game_id: str, store: Optional[str], game_title: str,
+                       target_price: Optional[float]) -> Optional[Tuple[Dict[str, float], str,
+                                                                        Optional[str], pd.DataFrame]]:
+    """
+    Construye las estadísticas, los gráficos y la tabla del historial de un juego.
+    
+    El resultado se cachea 5 minutos por juego, así los reruns de Streamlit no
+    vuelven a armar el DataFrame ni las figuras de Plotly. Las figuras se
+    guardan ya serializadas a JSON, que la caché copia mucho más rápido que un
+    objeto Figure. Retorna None si no hay historial.
+    """
+    history = _db.get_price_history(game_id, store)
+    if not history:
+        return None
+    
+    # Convertir a DataFrame
+    df = pd.DataFrame(history)
+    df['timestamp'] = pd.to_datetime(df['timestamp'].map(datetime.fromtimestamp))
+    df = df.sort_values('timestamp')
+    
+    # Estadísticas
+    stats = {
+        "current": df.iloc[-1]['price'] if len(df) > 0 else 0,
+        "min": df['price'].min(),
+        "max": df['price'].max(),
+        "avg": df['price'].mean()
+    }
+    min_price = stats["min"]
+    
+    # Historiales largos se grafican con promedios diarios; la tabla conserva todo
+    plot_df = df
+    if len(df) > HISTORY_PLOT_MAX_POINTS:
+        numeric_columns = df.columns.intersection(['price', 'original_price', 'discount_percent'])
+        plot_df = (df.set_index('timestamp')[numeric_columns]
+                   .resample('D').mean()
+                   .dropna(subset=['price'])
+                   .reset_index())
+    
+    # Gráfico de línea de precios
+    fig = go.Figure()
+    
+    # Línea de precio actual
+    fig.add_trace(go.Scatter(
+        x=plot_df['timestamp'],
+        y=plot_df['price'],
+        mode='lines+markers',
+        name='Precio',
+        line=dict(color='#1f77b4', width=2),
+        marker=dict(size=6)
+    ))
+    
+    # Línea de precio original
+    if 'original_price' in plot_df.columns:
+        fig.add_trace(go.Scatter(
+            x=plot_df['timestamp'],
+            y=plot_df['original_price'],
+            mode='lines',
+            name='Precio Original',
+            line=dict(color='#ff7f0e', width=1, dash='dash'),
+            opacity=0.6
+        ))
+    
+    # Línea de precio mínimo histórico
+    fig.add_hline(
+        y=min_price,
+        line_dash="dot",
+        line_color="red",
+        annotation_text=f"Mínimo: ${min_price:.2f}",
+        annotation_position="right"
+    )
+    
+    # Precio objetivo si existe
+    if target_price:
+        fig.add_hline(
+            y=target_price,
+            line_dash="dot",
+            line_color="green",
+            annotation_text=f"Objetivo: ${target_price:.2f}",
+            annotation_position="right"
+        )
+    
+    fig.update_layout(
+        title=f"Historial de Precios: {game_title}",
+        xaxis_title="Fecha",
+        yaxis_title="Precio (USD)",
+        hovermode='x unified',
+        height=500,
+        showlegend=True
+    )
+    
+    # Gráfico de descuentos
+    discount_fig = None
+    if 'discount_percent' in plot_df.columns and df['discount_percent'].max() > 0:
+        discount_fig = go.Figure()
+        discount_fig.add_trace(go.Bar(
+            x=plot_df['timestamp'],
+            y=plot_df['discount_percent'],
+            name='Descuento (%)',
+            marker_color='#2ca02c'
+        ))
+        
+        discount_fig.update_layout(
+            title="Descuentos a lo largo del tiempo",
+            xaxis_title="Fecha",
+            yaxis_title="Descuento (%)",
+            height=400,
+            showlegend=False
+        )
+    
+    # Tabla de historial
+    display_df = df[['timestamp', 'store', 'price', 'original_price', 'discount_percent', 'url']]
+    display_df = display_df.rename(columns={
+        'timestamp': 'Fecha',
+        'store': 'Tienda',
+        'price': 'Precio',
+        'original_price': 'Precio Original',
+        'discount_percent': 'Descuento',
+        'url': 'URL'
+    })
+    
+    discount_json = discount_fig.to_json() if discount_fig is not None else None
+    return stats, fig.to_json(), discount_json, display_df
+
+
 def render_price_history_page():
     """Renderiza la página de historial de precios."""
     st.header("📈 Historial de Precios")
@@ -168,170 +335,84 @@ def render_price_history_page():
     if selected:
         selected_item = game_options[selected]
         game_title = selected_item['game_title']
-        game_id = selected_item.get('game_id')
-        store = selected_item.get('store')
         
-        # Obtener historial
-        if game_id:
-            history = db.get_price_history(game_id, store)
-        else:
-            # Buscar por título si no hay ID
-            history = []
-            # Intentar buscar en la base de datos por título
-            all_history = db.get_price_history(game_title, store)
-            history = all_history if all_history else []
+        # Sin ID, el historial se busca por título
+        view = build_history_view(
+            db,
+            selected_item.get('game_id') or game_title,
+            selected_item.get('store'),
+            game_title,
+            selected_item.get('target_price')
+        )
         
-        if not history:
+        if view is None:
             st.warning(f"No hay historial de precios para '{game_title}' aún.")
             st.info("El historial se generará automáticamente cuando verifiques la watchlist.")
             return
         
-        # Convertir a DataFrame
-        df = pd.DataFrame(history)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
+        stats, fig_json, discount_json, display_df = view
         
         # Estadísticas
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            current_price = df.iloc[-1]['price'] if len(df) > 0 else 0
-            st.metric("Precio Actual", f"${current_price:.2f}")
+            st.metric("Precio Actual", f"${stats['current']:.2f}")
         with col2:
-            min_price = df['price'].min()
-            st.metric("Precio Mínimo", f"${min_price:.2f}")
+            st.metric("Precio Mínimo", f"${stats['min']:.2f}")
         with col3:
-            max_price = df['price'].max()
-            st.metric("Precio Máximo", f"${max_price:.2f}")
+            st.metric("Precio Máximo", f"${stats['max']:.2f}")
         with col4:
-            avg_price = df['price'].mean()
-            st.metric("Precio Promedio", f"${avg_price:.2f}")
+            st.metric("Precio Promedio", f"${stats['avg']:.2f}")
         
         st.markdown("---")
         
-        # Gráfico de línea de precios
         st.subheader("📊 Evolución de Precios")
+        st.plotly_chart(json.loads(fig_json), use_container_width=True)
         
-        fig = go.Figure()
-        
-        # Línea de precio actual
-        fig.add_trace(go.Scatter(
-            x=df['timestamp'],
-            y=df['price'],
-            mode='lines+markers',
-            name='Precio',
-            line=dict(color='#1f77b4', width=2),
-            marker=dict(size=6)
-        ))
-        
-        # Línea de precio original
-        if 'original_price' in df.columns:
-            fig.add_trace(go.Scatter(
-                x=df['timestamp'],
-                y=df['original_price'],
-                mode='lines',
-                name='Precio Original',
-                line=dict(color='#ff7f0e', width=1, dash='dash'),
-                opacity=0.6
-            ))
-        
-        # Línea de precio mínimo histórico
-        fig.add_hline(
-            y=min_price,
-            line_dash="dot",
-            line_color="red",
-            annotation_text=f"Mínimo: ${min_price:.2f}",
-            annotation_position="right"
-        )
-        
-        # Precio objetivo si existe
-        target_price = selected_item.get('target_price')
-        if target_price:
-            fig.add_hline(
-                y=target_price,
-                line_dash="dot",
-                line_color="green",
-                annotation_text=f"Objetivo: ${target_price:.2f}",
-                annotation_position="right"
-            )
-        
-        fig.update_layout(
-            title=f"Historial de Precios: {game_title}",
-            xaxis_title="Fecha",
-            yaxis_title="Precio (USD)",
-            hovermode='x unified',
-            height=500,
-            showlegend=True
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Gráfico de descuentos
-        if 'discount_percent' in df.columns and df['discount_percent'].max() > 0:
+        if discount_json is not None:
             st.subheader("🎯 Historial de Descuentos")
-            
-            fig2 = go.Figure()
-            fig2.add_trace(go.Bar(
-                x=df['timestamp'],
-                y=df['discount_percent'],
-                name='Descuento (%)',
-                marker_color='#2ca02c'
-            ))
-            
-            fig2.update_layout(
-                title="Descuentos a lo largo del tiempo",
-                xaxis_title="Fecha",
-                yaxis_title="Descuento (%)",
-                height=400,
-                showlegend=False
-            )
-            
-            st.plotly_chart(fig2, use_container_width=True)
+            st.plotly_chart(json.loads(discount_json), use_container_width=True)
         
         # Tabla de historial
         st.subheader("📋 Detalles del Historial")
-        display_df = df.copy()
-        display_df = display_df[['timestamp', 'store', 'price', 'original_price', 'discount_percent', 'url']]
-        display_df['timestamp'] = display_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
-        display_df['price'] = display_df['price'].apply(lambda x: f"${x:.2f}")
-        display_df['original_price'] = display_df['original_price'].apply(lambda x: f"${x:.2f}")
-        display_df['discount_percent'] = display_df['discount_percent'].apply(lambda x: f"{x:.1f}%")
         
-        display_df = display_df.rename(columns={
-            'timestamp': 'Fecha',
-            'store': 'Tienda',
-            'price': 'Precio',
-            'original_price': 'Precio Original',
-            'discount_percent': 'Descuento',
-            'url': 'URL'
-        })
-        
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
+        # El formato se aplica al renderizar, sin recorrer las filas en Python
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Fecha': st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm"),
+                'Precio': st.column_config.NumberColumn(format="$%.2f"),
+                'Precio Original': st.column_config.NumberColumn(format="$%.2f"),
+                'Descuento': st.column_config.NumberColumn(format="%.1f%%")
+            }
+        )
 
 
 def render_amazing_deals_page():
     """Renderiza la página de ofertas imperdibles."""
     st.header("🔥 Ofertas Imperdibles")
     
-    # Obtener ofertas imperdibles
-    deals = db.get_amazing_deals(limit=50)
+    # Estadísticas de todas las ofertas, agregadas en la base de datos
+    stats = db.get_amazing_deal_stats()
     
-    if not deals:
+    if not stats['count']:
         st.info("No hay ofertas imperdibles guardadas aún.")
         return
     
-    # Estadísticas
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Ofertas", len(deals))
+        st.metric("Total Ofertas", stats['count'])
     with col2:
-        avg_discount = sum(d['discount_percent'] for d in deals) / len(deals) if deals else 0
-        st.metric("Descuento Promedio", f"{avg_discount:.1f}%")
+        st.metric("Descuento Promedio", f"{stats['avg_discount']:.1f}%")
     with col3:
-        notified_count = sum(1 for d in deals if d.get('notified'))
-        st.metric("Notificadas", notified_count)
+        st.metric("Notificadas", stats['notified_count'])
     
     st.markdown("---")
     
+    # Obtener las ofertas más recientes
+    deals = db.get_amazing_deals(limit=50)
+    
     # Mostrar ofertas
     for deal in deals:
         with st.container():
@@ -348,7 +429,7 @@ def render_amazing_deals_page():
             col3, col4 = st.columns([2, 1])
             with col3:
                 st.markdown(f"**Precio Original:** ${deal['original_price']:.2f}")
-                st.markdown(f"**Fecha:** {deal['timestamp']}")
+                st.markdown(f"**Fecha:** {datetime.fromtimestamp(deal['timestamp'])}")
             with col4:
                 if st.button(f"🔗 Ver Oferta", key=f"deal_{deal['id']}"):
                     st.markdown(f"[Abrir enlace]({deal['url']})")
@@ -365,9 +446,8 @@ def render_search_page():
     
     if query:
         with st.spinner(f"Buscando '{query}'..."):
-            import asyncio
             try:
-                deals = asyncio.run(watchlist_manager.api_manager.search_game_global(query))
+                deals = run_async(watchlist_manager.api_manager.search_game_global(query))
             except Exception as e:
                 st.error(f"Error al buscar: {str(e)}")
                 deals = []
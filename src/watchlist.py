@@ -1,10 +1,15 @@
 """Gestión de la watchlist de juegos."""
 
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from src.database import Database
 from src.api_clients import APIManager, GameDeal
 from src.deal_analyzer import DealAnalyzer
-from src.scraper import GameStoreScraper
+from src.scraper import GameStoreScraper, static_session
+from src.browser_pool import browser_pool
+
+# Juegos de la watchlist que se consultan a la vez contra las APIs
+MAX_CONCURRENT_CHECKS = 8
 
 
 class WatchlistManager:
@@ -33,41 +38,58 @@ class WatchlistManager:
         """Verifica el precio actual de un juego en la watchlist."""
         # Buscar el juego en todas las plataformas
         deals = await self.api_manager.search_game_global(game_title)
-        
-        # Si hay un store específico, filtrar
+        return self._filter_store(deals, store)
+    
+    @staticmethod
+    def _filter_store(deals: List[GameDeal], store: Optional[str]) -> List[GameDeal]:
+        """Filtra las ofertas de un store específico, si se indicó uno."""
         if store:
-            deals = [d for d in deals if store.lower() in d.store.lower()]
-        
+            store_lower = store.lower()
+            deals = [d for d in deals if store_lower in d.store.lower()]
         return deals
     
-    async def check_all_games(self) -> List[Dict[str, Any]]:
+    async def check_all_games(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """
         Verifica todos los juegos en la watchlist.
         
+        `now` es la marca de tiempo del ciclo; por defecto, la hora actual.
         Retorna una lista de resultados con ofertas encontradas.
         """
+        now = now or datetime.now()
         watchlist = self.get_games()
+        
+        # Un mismo título vigilado en varios stores se busca una sola vez
+        titles = list(dict.fromkeys(item["game_title"] for item in watchlist))
+        
+        # Las búsquedas van en paralelo y los precios de ITAD se piden en bloque;
+        # el análisis se hace después, en orden
+        found = await self.api_manager.search_games_global(titles, MAX_CONCURRENT_CHECKS)
+        all_deals = [self._filter_store(found[item["game_title"]], item.get("store"))
+                     for item in watchlist]
+        
         results = []
+        # Las escrituras se acumulan y se guardan en una sola transacción al final
+        price_history = []
+        amazing_deals = []
+        amazing_results = []
+        checked = []
         
-        for item in watchlist:
+        for item, deals in zip(watchlist, all_deals):
             game_title = item["game_title"]
             game_id = item.get("game_id")
             target_price = item.get("target_price")
             store = item.get("store")
             
-            # Buscar ofertas actuales
-            deals = await self.check_game(game_title, game_id, store)
-            
             for deal in deals:
                 # Analizar la oferta
                 analysis = self.analyzer.analyze_deal(deal, game_id, target_price)
                 
                 # Guardar en historial
-                self.db.add_price_history(deal, game_id)
+                price_history.append((deal, game_id))
                 
                 # Verificar si es oferta imperdible
                 if analysis["is_amazing_deal"]:
-                    self.db.save_amazing_deal(deal, analysis["reason"] or "Oferta imperdible")
+                    amazing_deals.append((deal, analysis["reason"] or "Oferta imperdible"))
                 
                 # Verificar si cumple precio objetivo
                 meets_target = analysis.get("meets_target", False)
@@ -77,19 +99,36 @@ class WatchlistManager:
                     "deal": deal,
                     "analysis": analysis,
                     "meets_target": meets_target,
-                    "is_amazing_deal": analysis["is_amazing_deal"]
+                    "is_amazing_deal": analysis["is_amazing_deal"],
+                    "amazing_deal_id": None
                 }
                 
+                if analysis["is_amazing_deal"]:
+                    amazing_results.append(result)
                 results.append(result)
             
             # Actualizar última verificación
-            self.db.update_watchlist_check(game_title, store)
+            checked.append((game_title, store))
+        
+        with self.db.transaction():
+            self.db.add_price_history_many(price_history)
+            amazing_ids = self.db.save_amazing_deals_many(amazing_deals)
+            self.db.update_watchlist_checks_many(checked, now)
+        
+        # El ID guardado permite marcar la oferta como notificada después
+        for result, amazing_id in zip(amazing_results, amazing_ids):
+            result["amazing_deal_id"] = amazing_id
         
         return results
     
+    async def close(self):
+        """Cierra los navegadores y la sesión HTTP que el scraper mantiene abiertos."""
+        await browser_pool.close()
+        await static_session.close()
+    
     async def verify_price_with_scraper(self, game_url: str, store: str) -> Optional[GameDeal]:
         """Verifica el precio usando scraper para validación adicional."""
-        async with GameStoreScraper() as scraper:
+        async with GameStoreScraper(db=self.db) as scraper:
             scraped = await scraper.verify_price(game_url, store)
             
             if scraped:
@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 """Script para ejecutar la aplicación Streamlit."""
 
-import subprocess
 import sys
 from pathlib import Path
 
+from streamlit.web import bootstrap
+
 if __name__ == "__main__":
     app_path = Path(__file__).parent / "src" / "streamlit_app.py"
-    subprocess.run([sys.executable, "-m", "streamlit", "run", str(app_path)])
 
+    # Se arranca en este mismo intérprete, sin lanzar `python -m streamlit`
+    flag_options = {"server.headless": True}
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run(str(app_path), False, sys.argv[1:], flag_options)
@@ -0,0 +1,70 @@
+"""Pruebas del gestor de APIs."""
+
+import asyncio
+from datetime import datetime
+
+from src.api_clients import APIManager, GameDeal, SessionHolder
+
+
+def make_deal(title: str, store: str, price: float) -> GameDeal:
+    return GameDeal(
+        title=title,
+        store=store,
+        price=price,
+        original_price=20.0,
+        discount_percent=50.0,
+        url="https://example.com",
+        deal_id=f"{title}-{store}",
+        timestamp=datetime.now()
+    )
+
+
+def test_search_games_global_fetches_itad_prices_in_one_call():
+    manager = APIManager("key")
+    bulk_calls = []
+    
+    async def no_cheapshark_games(query):
+        return []
+    
+    async def no_cheapshark_deals(*args):
+        return []
+    
+    async def search_game(query):
+        return [{"id": query.lower()}]
+    
+    async def get_current_prices_bulk(game_ids):
+        bulk_calls.append(list(game_ids))
+        return {game_id: [make_deal(game_id, "GOG", 4.99)] for game_id in game_ids}
+    
+    manager.cheapshark.search_game = no_cheapshark_games
+    manager.cheapshark.get_deals = no_cheapshark_deals
+    manager.itad.search_game = search_game
+    manager.itad.get_current_prices_bulk = get_current_prices_bulk
+    
+    found = asyncio.run(manager.search_games_global(["Portal", "Hades", "Celeste"]))
+    
+    assert bulk_calls == [["portal", "hades", "celeste"]]
+    assert {query: [deal.title for deal in deals] for query, deals in found.items()} == {
+        "Portal": ["portal"],
+        "Hades": ["hades"],
+        "Celeste": ["celeste"],
+    }
+
+
+def test_session_holder_closes_session_of_previous_loop():
+    holder = SessionHolder()
+    
+    async def get_session():
+        return holder.get()
+    
+    async def get_session_and_yield():
+        session = holder.get()
+        await asyncio.sleep(0)
+        return session
+    
+    first = asyncio.run(get_session())
+    second = asyncio.run(get_session_and_yield())
+    
+    assert first is not second
+    assert first.closed
+    asyncio.run(holder.close())
@@ -0,0 +1,271 @@
+"""Pruebas de la base de datos SQLite."""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from src.api_clients import GameDeal
+from src.database import SCHEMA_VERSION, Database, to_epoch
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(tmp_path / "test.db")
+    yield database
+    database.close()
+
+
+# Esquema original, con fechas DATETIME y sin `user_version`
+BASELINE_SCHEMA_SQL = """
+    CREATE TABLE price_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id TEXT NOT NULL,
+        game_title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        price REAL NOT NULL,
+        original_price REAL NOT NULL,
+        discount_percent REAL NOT NULL,
+        deal_id TEXT,
+        url TEXT,
+        timestamp DATETIME NOT NULL,
+        UNIQUE(game_id, store, timestamp)
+    );
+    CREATE TABLE watchlist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_title TEXT NOT NULL,
+        game_id TEXT,
+        target_price REAL,
+        store TEXT,
+        created_at DATETIME NOT NULL,
+        last_checked DATETIME,
+        is_active INTEGER DEFAULT 1,
+        UNIQUE(game_title, store)
+    );
+    CREATE TABLE amazing_deals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        price REAL NOT NULL,
+        original_price REAL NOT NULL,
+        discount_percent REAL NOT NULL,
+        url TEXT NOT NULL,
+        deal_id TEXT,
+        reason TEXT NOT NULL,
+        timestamp DATETIME NOT NULL,
+        notified INTEGER DEFAULT 0
+    );
+    CREATE TABLE historical_lows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        game_id TEXT NOT NULL,
+        game_title TEXT NOT NULL,
+        store TEXT NOT NULL,
+        lowest_price REAL NOT NULL,
+        timestamp DATETIME NOT NULL,
+        UNIQUE(game_id, store)
+    );
+    CREATE INDEX idx_price_history_game_store ON price_history(game_id, store);
+    CREATE INDEX idx_price_history_timestamp ON price_history(timestamp);
+    CREATE INDEX idx_watchlist_active ON watchlist(is_active);
+"""
+
+
+def make_deal(price: float, deal_id: str, timestamp: datetime, store: str = "Steam") -> GameDeal:
+    return GameDeal(
+        title="Portal",
+        store=store,
+        price=price,
+        original_price=20.0,
+        discount_percent=(20.0 - price) / 20.0 * 100,
+        url=f"https://example.com/{deal_id}",
+        deal_id=deal_id,
+        timestamp=timestamp
+    )
+
+
+def test_same_store_deals_keep_lowest_price(db):
+    now = datetime.now()
+    deals = [make_deal(9.99, "a", now), make_deal(4.99, "b", now), make_deal(7.49, "c", now)]
+    
+    assert db.add_price_history_many([(deal, "portal") for deal in deals])
+    
+    history = db.get_price_history("portal", "Steam")
+    assert len(history) == 1
+    assert history[0]["price"] == 4.99
+    assert history[0]["deal_id"] == "b"
+
+
+def test_deals_from_different_stores_are_all_kept(db):
+    now = datetime.now()
+    deals = [make_deal(9.99, "a", now), make_deal(4.99, "b", now, store="GOG")]
+    
+    assert db.add_price_history_many([(deal, "portal") for deal in deals])
+    
+    assert len(db.get_price_history("portal")) == 2
+
+
+def test_legacy_timestamps_in_same_second_keep_lowest_price(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id TEXT NOT NULL,
+            game_title TEXT NOT NULL,
+            store TEXT NOT NULL,
+            price REAL NOT NULL,
+            original_price REAL NOT NULL,
+            discount_percent REAL NOT NULL,
+            deal_id TEXT,
+            url TEXT,
+            timestamp DATETIME NOT NULL,
+            UNIQUE(game_id, store, timestamp)
+        );
+        INSERT INTO price_history
+        (game_id, game_title, store, price, original_price, discount_percent, deal_id, url, timestamp)
+        VALUES
+        ('portal', 'Portal', 'Steam', 9.99, 20.0, 50.0, 'a', 'u', '2024-01-01T10:00:00.100000'),
+        ('portal', 'Portal', 'Steam', 4.99, 20.0, 75.0, 'b', 'u', '2024-01-01T10:00:00.900000'),
+        ('portal', 'Portal', 'Steam', 7.49, 20.0, 62.5, 'c', 'u', '2024-01-01T10:00:05');
+    """)
+    conn.close()
+    
+    database = Database(path)
+    try:
+        history = database.get_price_history("portal", "Steam")
+    finally:
+        database.close()
+    
+    assert sorted(row["price"] for row in history) == [4.99, 7.49]
+
+
+def test_amazing_deals_are_notified_once_per_price(db):
+    now = datetime.now()
+    ids = db.save_amazing_deals_many([(make_deal(4.99, "a", now), "mínimo"), (make_deal(9.99, "b", now, store="GOG"), "mínimo")])
+    
+    assert len(ids) == 2
+    assert not db.is_deal_notified("Portal", "Steam", 4.99)
+    
+    db.mark_deals_notified_many(ids[:1])
+    
+    assert db.is_deal_notified("Portal", "Steam", 4.99)
+    assert db.is_deal_notified("Portal", "Steam", 5.99)
+    assert not db.is_deal_notified("Portal", "Steam", 3.99)
+    assert not db.is_deal_notified("Portal", "GOG", 9.99)
+    assert db.get_amazing_deal_stats()["notified_count"] == 1
+
+
+def test_baseline_database_is_migrated_to_epoch_timestamps(tmp_path):
+    path = tmp_path / "baseline.db"
+    when = datetime(2024, 3, 1, 12, 30, 15)
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA_SQL)
+    # La versión original guardaba las fechas con el adaptador por defecto de sqlite3
+    stamp = when.isoformat(" ")
+    conn.execute(
+        "INSERT INTO price_history (game_id, game_title, store, price, original_price, "
+        "discount_percent, deal_id, url, timestamp) VALUES ('portal', 'Portal', 'Steam', "
+        "4.99, 20.0, 75.0, 'a', 'u', ?)", (stamp,)
+    )
+    conn.execute(
+        "INSERT INTO amazing_deals (game_title, store, price, original_price, discount_percent, "
+        "url, deal_id, reason, timestamp, notified) VALUES ('Portal', 'Steam', 4.99, 20.0, 75.0, "
+        "'u', 'a', 'mínimo', ?, 1)", (stamp,)
+    )
+    conn.execute(
+        "INSERT INTO historical_lows (game_id, game_title, store, lowest_price, timestamp) "
+        "VALUES ('portal', 'Portal', 'Steam', 4.99, ?)", (stamp,)
+    )
+    conn.execute(
+        "INSERT INTO watchlist (game_title, target_price, created_at) VALUES ('Portal', 5.0, ?)",
+        (stamp,)
+    )
+    conn.commit()
+    conn.close()
+    
+    database = Database(path)
+    try:
+        assert database.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        for table in ("price_history", "amazing_deals", "historical_lows"):
+            row = database.conn.execute(f"SELECT typeof(timestamp), timestamp FROM {table}").fetchone()
+            assert tuple(row) == ("integer", to_epoch(when))
+        
+        assert database.get_price_history("portal")[0]["price"] == 4.99
+        assert database.get_amazing_deals(notified_only=True)[0]["deal_id"] == "a"
+        assert database.get_historical_low("portal")["lowest_price"] == 4.99
+        assert database.get_watchlist()[0]["game_title"] == "Portal"
+    finally:
+        database.close()
+    
+    # Un segundo arranque no vuelve a migrar ni pierde filas
+    database = Database(path)
+    try:
+        assert len(database.get_price_history("portal")) == 1
+    finally:
+        database.close()
+
+
+def test_conflict_upsert_only_lowers_the_price(db):
+    now = datetime.now()
+    
+    assert db.add_price_history(make_deal(4.99, "a", now), "portal")
+    assert db.add_price_history(make_deal(9.99, "b", now), "portal")
+    assert db.get_price_history("portal")[0]["deal_id"] == "a"
+    
+    assert db.add_price_history(make_deal(3.99, "c", now), "portal")
+    history = db.get_price_history("portal")
+    assert [(row["price"], row["deal_id"]) for row in history] == [(3.99, "c")]
+
+
+def test_writer_connection_is_persistent_and_in_wal_mode(db):
+    conn = db.conn
+    
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db.add_to_watchlist("Portal")
+    assert db.conn is conn
+
+
+def test_reader_pool_is_read_only(db):
+    db.add_to_watchlist("Portal")
+    
+    with db._reader() as conn:
+        assert conn is not db.conn
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM watchlist")
+    
+    assert len(db.get_watchlist()) == 1
+
+
+def test_historical_low_cache_is_invalidated_on_update(db):
+    db.update_historical_low("portal", "Portal", "Steam", 9.99)
+    assert db.get_historical_low("portal")["lowest_price"] == 9.99
+    assert db.get_historical_low("portal", "Steam")["lowest_price"] == 9.99
+    
+    db.update_historical_low("portal", "Portal", "Steam", 4.99)
+    
+    assert db.get_historical_low("portal")["lowest_price"] == 4.99
+    assert db.get_historical_low("portal", "Steam")["lowest_price"] == 4.99
+
+
+def test_scrape_cache_respects_max_age(db):
+    price = {
+        "title": "Portal",
+        "store": "Steam",
+        "price": 4.99,
+        "original_price": 20.0,
+        "discount_percent": 75.0,
+        "timestamp": to_epoch(datetime.now())
+    }
+    url = "https://example.com/portal"
+    
+    assert db.put_cached(url, price)
+    assert db.get_cached(url, 60)["price"] == 4.99
+    
+    # Envejece la entrada dos minutos
+    db.conn.execute("UPDATE scrape_cache SET fetched_at = fetched_at - 120")
+    
+    assert db.get_cached(url, 60) is None
+    assert db.get_cached(url, 600) is not None
+    
+    db.evict_cached(60)
+    assert db.get_cached(url, 600) is None
@@ -0,0 +1,71 @@
+"""Pruebas del scraper: parseo de precios y API de Steam."""
+
+import asyncio
+
+import pytest
+
+from src.scraper import GameStoreScraper
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1,234", 1234.0),
+    ("1.234", 1234.0),
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("¥ 1,980", 1980.0),
+    ("$19.99", 19.99),
+    ("19,9 €", 19.9),
+    ("$5", 5.0),
+    ("Free", 0.0),
+    ("1 299,99 €", 1299.99),
+    ("1234.56", 1234.56),
+    ("$59.99 $19.99", 59.99),
+    ("$1,299.99 $999.99", 1299.99),
+])
+def test_parse_price(text, expected):
+    assert GameStoreScraper()._parse_price(text) == expected
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.ok = True
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def json(self, loads=None):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self, data):
+        self.data = data
+    
+    def get(self, url, params=None):
+        return FakeResponse(self.data)
+
+
+def steam_scraper(data) -> GameStoreScraper:
+    return GameStoreScraper(get_session=lambda: FakeSession(data))
+
+
+def test_steam_api_price():
+    scraper = steam_scraper({"620": {"success": True, "data": {
+        "name": "Portal 2",
+        "price_overview": {"initial": 999, "final": 199, "discount_percent": 80}
+    }}})
+    
+    scraped = asyncio.run(scraper.fetch_steam_api_price("https://store.steampowered.com/app/620/"))
+    
+    assert (scraped.title, scraped.price, scraped.original_price) == ("Portal 2", 1.99, 9.99)
+
+
+@pytest.mark.parametrize("overview", [{}, {"initial": 999}, None])
+def test_steam_api_partial_price_falls_back(overview):
+    scraper = steam_scraper({"620": {"success": True, "data": {"price_overview": overview}}})
+    
+    assert asyncio.run(scraper.fetch_steam_api_price("https://store.steampowered.com/app/620/")) is None